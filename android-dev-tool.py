@@ -11,14 +11,316 @@ import subprocess
 import http.server
 import socketserver
 import threading
+import re
 import time
+import hashlib
+import mimetypes
+import posixpath
 import webbrowser
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+# Lockfile -> comando de instalação (mesma lógica do backend.py)
+LOCKFILES = [
+    ("package-lock.json", ["npm", "ci", "--prefer-offline", "--no-audit", "--no-fund"]),
+    ("npm-shrinkwrap.json", ["npm", "ci", "--prefer-offline", "--no-audit", "--no-fund"]),
+    ("pnpm-lock.yaml", ["pnpm", "install", "--frozen-lockfile", "--prefer-offline"]),
+    ("yarn.lock", ["yarn", "install", "--frozen-lockfile", "--prefer-offline"]),
+]
+INSTALL_MARKER = ".android-dev-tool-install.json"
+
+PROJETO_PADRAO = "/data/data/com.termux/files/home/gestao-financeira"
+# Registro de projetos compartilhado com o backend.py (id -> caminho)
+WORKSPACE_FILE = os.environ.get("DEVTOOL_WORKSPACE",
+                                os.path.expanduser("~/.android-dev-tool/workspace.json"))
+
+def resolver_projeto(nome):
+    """Aceita um ID do workspace do backend ou um caminho de diretório"""
+    try:
+        with open(WORKSPACE_FILE, "r") as f:
+            projetos = json.load(f).get("projects", {})
+        if nome in projetos:
+            return projetos[nome]
+    except (OSError, ValueError):
+        pass
+    return os.path.abspath(os.path.expanduser(nome))
+
+class AssetCache:
+    """Cache LRU em memória dos arquivos pequenos do build (e suas variantes .gz/.br).
+
+    Cada entrada guarda (tamanho, mtime) do arquivo; se o arquivo mudar depois
+    de um novo build, a entrada é invalidada na próxima requisição.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entry_bytes=1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries = OrderedDict()  # caminho -> (tamanho, mtime_ns, bytes)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def read(self, path, st):
+        """Conteúdo do arquivo, do cache se ainda válido; None se for grande demais para cachear"""
+        if st.st_size > min(self.max_entry_bytes, self.max_bytes):
+            return None
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                if entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                    self.entries.move_to_end(path)
+                    self.hits += 1
+                    return entry[2]
+                self._remove(path)
+                self.invalidations += 1
+            self.misses += 1
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) != st.st_size:
+            return None  # arquivo mudou durante a leitura; o chamador cai no sendfile
+        with self.lock:
+            if path not in self.entries:
+                self.entries[path] = (st.st_size, st.st_mtime_ns, data)
+                self.size += len(data)
+                while self.size > self.max_bytes:
+                    self._remove(next(iter(self.entries)))
+                    self.evictions += 1
+        return data
+
+    def _remove(self, path):
+        self.size -= len(self.entries.pop(path)[2])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+class StaticBuildHandler(http.server.BaseHTTPRequestHandler):
+    """Servidor rápido para o build: sendfile, ETag/304, cache imutável e .gz/.br pré-comprimidos"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive entre requisições
+    disable_nagle_algorithm = True  # cabeçalhos e corpo (sendfile) saem em escritas separadas
+    root = "."
+    cache = None  # AssetCache opcional
+    # Arquivos com hash no nome (index-BfZ0k1a2.js, main.3f2a1b9c.chunk.js) nunca mudam
+    HASHED_RE = re.compile(r'[.-](?P<hash>[A-Za-z0-9_]{8,})(?:\.chunk)?\.[A-Za-z0-9]+$')
+    ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        url_path = urlsplit(self.path).path
+        if url_path == "/__devtool/cache":
+            self._send_cache_stats()
+            return
+        path = self._resolve(url_path)
+        if path is None:
+            self.send_error(404, "Arquivo não encontrado")
+            return
+
+        # Variante pré-comprimida, se o cliente aceitar e ela existir no build
+        encoding = None
+        accepted = self.headers.get("Accept-Encoding", "")
+        for name, suffix in self.ENCODINGS:
+            if name in accepted and os.path.isfile(path + suffix):
+                encoding, send_path = name, path + suffix
+                break
+        else:
+            send_path = path
+
+        try:
+            st = os.stat(send_path)
+        except OSError:
+            self.send_error(404, "Arquivo não encontrado")
+            return
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}{"-" + encoding if encoding else ""}"'
+        if self._not_modified(etag, st.st_mtime):
+            self.send_response(304)
+            self._send_cache_headers(path, etag, st.st_mtime, encoding)
+            self.end_headers()
+            return
+
+        start, end = 0, st.st_size - 1
+        status = 200
+        byte_range = self.headers.get("Range")
+        if byte_range and encoding is None:
+            parsed = self._parse_range(byte_range, st.st_size)
+            if parsed is None:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{st.st_size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start, end = parsed
+            status = 206
+
+        # Arquivos pequenos vêm do cache em memória; o resto via sendfile
+        data = self.cache.read(send_path, st) if self.cache and not head else None
+        length = max(0, end - start + 1)
+        self.send_response(status)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{st.st_size}")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self._send_cache_headers(path, etag, st.st_mtime, encoding)
+        self.end_headers()
+        if head or not length:
+            return
+        if data is not None:
+            self.wfile.write(data[start:end + 1] if status == 206 else data)
+            return
+        try:
+            with open(send_path, "rb") as f:
+                self._send_body(f, start, length)
+        except OSError:
+            self.close_connection = True
+
+    def _send_cache_stats(self):
+        body = json.dumps(self.cache.stats() if self.cache else {"enabled": False}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _resolve(self, url_path):
+        """Mapeia a URL para um arquivo dentro do build (com fallback de SPA para index.html)"""
+        rel = posixpath.normpath(unquote(url_path)).lstrip("/")
+        if rel.startswith(".."):
+            return None
+        path = os.path.join(self.root, rel)
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if os.path.isfile(path):
+            return path
+        if not os.path.splitext(rel)[1]:
+            index = os.path.join(self.root, "index.html")
+            return index if os.path.isfile(index) else None
+        return None
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    @staticmethod
+    def _parse_range(header, size):
+        """Um único intervalo 'bytes=inicio-fim'; None se for insatisfatível"""
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+        if not match or size == 0 or match.group(1) == match.group(2) == "":
+            return None
+        if match.group(1) == "":
+            start, end = max(0, size - int(match.group(2))), size - 1
+        else:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        return (start, end) if start <= end else None
+
+    @classmethod
+    def _is_hashed(cls, name):
+        # Hash de verdade (sem "-"): hex com dígito ou maiúsculas/minúsculas com dígito,
+        # a mesma regra de BundleAnalyzer.is_hash. apple-touch-icon.png,
+        # android-chrome-192x192.png e logo-original.svg não são.
+        match = cls.HASHED_RE.search(name)
+        if not match:
+            return False
+        digest = match.group("hash")
+        if not re.search(r'[0-9]', digest):
+            return False
+        return bool(re.fullmatch(r'[0-9a-f]+', digest)) or (
+            bool(re.search(r'[A-Z]', digest)) and bool(re.search(r'[a-z]', digest)))
+
+    def _send_cache_headers(self, path, etag, mtime, encoding):
+        if self._is_hashed(os.path.basename(path)):
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        else:
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.send_header("Vary", "Accept-Encoding")
+
+    def _send_body(self, f, offset, length):
+        """Transferência zero-copy com os.sendfile; cópia comum se não for suportado"""
+        self.wfile.flush()
+        try:
+            sock = self.connection.fileno()
+            while length > 0:
+                sent = os.sendfile(sock, f.fileno(), offset, length)
+                if sent == 0:
+                    break
+                offset += sent
+                length -= sent
+        except (AttributeError, OSError) as e:
+            if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                return
+            f.seek(offset)
+            while length > 0:
+                chunk = f.read(min(length, 64 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                length -= len(chunk)
+
+def criar_servidor_estatico(dist_dir, port, host="0.0.0.0", cache_bytes=0):
+    """Cria o servidor estático rápido (uma thread por conexão) para o diretório do build.
+
+    Com cache_bytes > 0, arquivos pequenos ficam num cache LRU em memória
+    (estatísticas em /__devtool/cache).
+    """
+    cache = AssetCache(cache_bytes) if cache_bytes > 0 else None
+    handler = type("BuildHandler", (StaticBuildHandler,),
+                   {"root": os.path.abspath(dist_dir), "cache": cache})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
 
 class AndroidDevTool:
-    def __init__(self):
-        self.project_dir = "/data/data/com.termux/files/home/gestao-financeira"
-        self.port = 8080
+    def __init__(self, project_dir=None):
+        self.project_dir = project_dir or os.environ.get("DEVTOOL_PROJECT_DIR", PROJETO_PADRAO)
+        self.port = int(os.environ.get("DEVTOOL_PORT", 8080))
+        self.asset_cache_mb = 32  # cache em memória do modo rápido (0 desativa)
+        self._manifesto = None  # (mtime_ns, tamanho, dados) do package.json lido por último
+        
+    def package_json(self):
+        """package.json do projeto, relido só quando mtime ou tamanho mudam"""
+        caminho = os.path.join(self.project_dir, "package.json")
+        st = os.stat(caminho)
+        if not self._manifesto or self._manifesto[:2] != (st.st_mtime_ns, st.st_size):
+            with open(caminho, "r") as f:
+                self._manifesto = (st.st_mtime_ns, st.st_size, json.load(f))
+        return self._manifesto[2]
         
     def check_project(self):
         """Verifica se o projeto existe e tem as dependências"""
@@ -39,14 +341,66 @@ class AndroidDevTool:
         print("✅ Projeto válido encontrado!")
         return True
         
-    def install_dependencies(self):
-        """Instala dependências do projeto"""
-        print("📦 Instalando dependências...")
+    def _plano_instalacao(self):
+        """Escolhe o comando pelo lockfile e calcula o hash de package.json + lockfile"""
+        lockfile = None
+        comando = ["npm", "install", "--prefer-offline", "--no-audit", "--no-fund"]
+        for nome, comando_lock in LOCKFILES:
+            if os.path.exists(os.path.join(self.project_dir, nome)):
+                lockfile, comando = nome, comando_lock
+                break
+                
+        digest = hashlib.sha256()
+        for nome in ("package.json", lockfile):
+            if nome:
+                with open(os.path.join(self.project_dir, nome), "rb") as f:
+                    digest.update(f.read())
+                    
+        marcador = {}
+        try:
+            with open(os.path.join(self.project_dir, "node_modules", INSTALL_MARKER), "r") as f:
+                marcador = json.load(f)
+        except (OSError, ValueError):
+            pass
+            
+        return lockfile, comando, digest.hexdigest(), marcador
+        
+    def _salvar_marcador(self, marcador):
+        caminho = os.path.join(self.project_dir, "node_modules", INSTALL_MARKER)
+        if os.path.isdir(os.path.dirname(caminho)):
+            with open(caminho, "w") as f:
+                json.dump(marcador, f)
+        
+    def install_dependencies(self, forcar=False):
+        """Instala dependências do projeto (pula se o lockfile não mudou)"""
         try:
             os.chdir(self.project_dir)
-            result = subprocess.run(["npm", "install"], capture_output=True, text=True)
+            lockfile, comando, hash_atual, marcador = self._plano_instalacao()
+            
+            if marcador.get("hash") == hash_atual and not forcar:
+                economia = marcador.get("duration") or 0
+                marcador["skips"] = marcador.get("skips", 0) + 1
+                marcador["totalTimeSaved"] = round(marcador.get("totalTimeSaved", 0) + economia, 3)
+                self._salvar_marcador(marcador)
+                print(f"⚡ Dependências já atualizadas ({lockfile or 'package.json'} não mudou)")
+                print(f"⏱️  Tempo economizado: {economia:.1f}s (total: {marcador['totalTimeSaved']:.1f}s)")
+                return True
+                
+            print(f"📦 Instalando dependências: {' '.join(comando)}")
+            inicio = time.monotonic()
+            result = subprocess.run(comando, capture_output=True, text=True)
+            duracao = round(time.monotonic() - inicio, 3)
             if result.returncode == 0:
-                print("✅ Dependências instaladas com sucesso!")
+                self._salvar_marcador({
+                    "hash": hash_atual,
+                    "lockfile": lockfile,
+                    "command": " ".join(comando),
+                    "duration": duracao,
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "skips": marcador.get("skips", 0),
+                    "totalTimeSaved": marcador.get("totalTimeSaved", 0)
+                })
+                print(f"✅ Dependências instaladas com sucesso em {duracao:.1f}s!")
                 return True
             else:
                 print(f"❌ Erro ao instalar dependências: {result.stderr}")
@@ -111,17 +465,33 @@ class AndroidDevTool:
         except Exception as e:
             print(f"❌ Erro: {e}")
             
+    def serve_build_fast(self):
+        """Serve o build estático com o servidor rápido (threads, sendfile, cache HTTP)"""
+        dist_dir = os.path.join(self.project_dir, "dist")
+        if not os.path.exists(dist_dir):
+            print("❌ Diretório dist não encontrado. Execute o build primeiro.")
+            return False
+            
+        print(f"⚡ Servindo build estático (modo rápido) na porta {self.port}...")
+        try:
+            cache_bytes = self.asset_cache_mb * 1024 * 1024
+            with criar_servidor_estatico(dist_dir, self.port, cache_bytes=cache_bytes) as httpd:
+                print(f"✅ Servidor estático rodando em http://localhost:{self.port}")
+                print(f"📱 Acesse no navegador Android: http://127.0.0.1:{self.port}")
+                print("⏹️  Pressione Ctrl+C para parar")
+                httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\n🛑 Servidor parado.")
+        except Exception as e:
+            print(f"❌ Erro: {e}")
+            
     def run_tests(self):
         """Executa testes se existirem"""
         print("🧪 Verificando testes...")
         try:
             os.chdir(self.project_dir)
             # Verifica se há configuração de testes
-            package_data = {}
-            with open("package.json", "r") as f:
-                package_data = json.load(f)
-                
-            scripts = package_data.get("scripts", {})
+            scripts = self.package_json().get("scripts", {})
             if "test" in scripts:
                 print("▶️  Executando testes...")
                 result = subprocess.run(["npm", "test"], capture_output=True, text=True)
@@ -156,8 +526,7 @@ class AndroidDevTool:
         print("=" * 40)
         
         try:
-            with open(os.path.join(self.project_dir, "package.json"), "r") as f:
-                package_data = json.load(f)
+            package_data = self.package_json()
                 
             print(f"Nome: {package_data.get('name', 'N/A')}")
             print(f"Versão: {package_data.get('version', 'N/A')}")
@@ -171,6 +540,14 @@ class AndroidDevTool:
             for dep in list(package_data.get("dependencies", {}).keys())[:5]:
                 print(f"  • {dep}")
                 
+            workspaces = package_data.get("workspaces") or []
+            if isinstance(workspaces, dict):
+                workspaces = workspaces.get("packages") or []
+            if workspaces:
+                print("\n🗂️  Workspaces:")
+                for padrao in workspaces:
+                    print(f"  • {padrao}")
+                
         except Exception as e:
             print(f"❌ Erro ao ler informações: {e}")
     
@@ -187,10 +564,11 @@ class AndroidDevTool:
             print("5. 🌐 Servir build estático")
             print("6. 🧪 Executar testes")
             print("7. 🧹 Executar linter")
-            print("8. 🚪 Sair")
+            print("8. ⚡ Servir build estático (modo rápido)")
+            print("9. 🚪 Sair")
             print("-" * 50)
             
-            choice = input("Escolha uma opção (1-8): ").strip()
+            choice = input("Escolha uma opção (1-9): ").strip()
             
             if choice == "1":
                 self.show_project_info()
@@ -209,13 +587,22 @@ class AndroidDevTool:
             elif choice == "7":
                 self.lint_project()
             elif choice == "8":
+                self.serve_build_fast()
+            elif choice == "9":
                 print("👋 Até logo!")
                 break
             else:
                 print("❌ Opção inválida!")
                 
 if __name__ == "__main__":
-    tool = AndroidDevTool()
+    # --projeto <id|caminho> escolhe outro projeto do workspace
+    projeto = None
+    if "--projeto" in sys.argv:
+        i = sys.argv.index("--projeto")
+        if i + 1 < len(sys.argv):
+            projeto = resolver_projeto(sys.argv[i + 1])
+        del sys.argv[i:i + 2]
+    tool = AndroidDevTool(projeto)
     
     if len(sys.argv) > 1:
         command = sys.argv[1]
@@ -229,11 +616,13 @@ if __name__ == "__main__":
             tool.start_dev_server()
         elif command == "serve":
             tool.serve_build()
+        elif command == "serve-fast":
+            tool.serve_build_fast()
         elif command == "test":
             tool.run_tests()
         elif command == "lint":
             tool.lint_project()
         else:
-            print("Comandos: info, install, build, dev, serve, test, lint")
+            print("Comandos: info, install, build, dev, serve, serve-fast, test, lint [--projeto <id|caminho>]")
     else:
         tool.menu()
\ No newline at end of file
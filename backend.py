@@ -12,42 +12,2955 @@ import asyncio
 import logging
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import threading
 import time
 import websocket
 import shutil
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+import uuid
+import mimetypes
+import re
+import signal
+import gzip
+import heapq
+import fnmatch
+import hashlib
+import shlex
+import tempfile
+import contextlib
+import struct
+import ctypes
+import ctypes.util
+import resource
+import sqlite3
+import queue
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
 # Configuration
 @dataclass
 class Config:
-    project_dir: str = "/data/data/com.termux/files/home/gestao-financeira"
-    port: int = 3001
-    api_port: int = 3002
+    project_dir: str = os.environ.get("DEVTOOL_PROJECT_DIR", "/data/data/com.termux/files/home/gestao-financeira")
+    port: int = int(os.environ.get("DEVTOOL_PORT", 3001))
+    api_port: int = int(os.environ.get("DEVTOOL_API_PORT", 3002))
+    workspace_file: str = os.environ.get("DEVTOOL_WORKSPACE",
+                                         str(Path.home() / ".android-dev-tool" / "workspace.json"))
+    history_db: str = os.environ.get("DEVTOOL_HISTORY_DB",
+                                     str(Path.home() / ".android-dev-tool" / "history.db"))  # "" disables
+    history_max_bytes: int = 64 * 1024 * 1024  # oldest runs and logs are deleted beyond this
+    history_output_bytes: int = 16 * 1024  # stdout/stderr tail kept per stored run
+    history_batch: int = 1000  # most queued writes committed in one transaction
+    history_flush_interval: float = 0.5  # seconds a write may wait for others to share its commit
+    history_queue: int = 20000  # queued writes before new ones are dropped
+    max_parallel_commands: int = 0  # commands running at once across all projects; 0 = half the CPUs
+    metrics_sample_interval: float = 60.0  # seconds between process stat samples
+    metrics_history: int = 4320  # samples/command runs kept in memory (3 days at one a minute)
+    build_profiles: int = 20  # profiled builds kept in .devtool/build-profiles
+    profile_sample_interval: float = 0.25
+    lint_batch_size: int = 200  # most files passed to one ESLint process
+    slowest_tests: int = 10  # slowest tests reported per run
+    test_history_limit: int = 100  # test runs kept in .devtool/test-history.jsonl
+    command_timeout: float = 3600.0  # seconds before a command's process group is killed; 0 = never
+    job_memory_percent: float = 50.0  # RSS cap per process tree, as a share of total RAM; 0 = none
+    job_cpu_seconds: int = 0  # RLIMIT_CPU for every spawned process; 0 = unlimited
+    job_nice: Dict[str, int] = None  # nice level by command kind ("default" for the rest)
+    min_available_memory: int = 512 * 1024 * 1024  # new commands wait while MemAvailable is lower
     allowed_origins: List[str] = None
     max_log_lines: int = 1000
+    max_concurrent_jobs: int = 2
+    job_limits: Dict[str, int] = None
+    max_job_output_lines: int = 2000
+    max_finished_jobs: int = 50
+    max_output_lines: int = 500
+    max_line_length: int = 8192
+    dev_log_lines: int = 2000
+    dev_ready_timeout: float = 5.0
+    bundle_top_files: int = 20
+    brotli_quality: int = 11
+    bundle_history_limit: int = 200
+    build_snapshots: int = 0  # dist/ snapshots to keep per project (0 disables)
+    watch_debounce: float = 0.3
+    watch_poll_interval: float = 1.0
+    file_chunk_size: int = 1024 * 1024  # largest slice returned by one file read
+    search_max_results: int = 1000  # page size cap for /api/search
+    search_max_file_bytes: int = 1024 * 1024  # larger files are left out of the search index
     
     def __post_init__(self):
         if self.allowed_origins is None:
             self.allowed_origins = ["http://localhost:8080", "http://127.0.0.1:8080"]
+        if self.job_limits is None:
+            self.job_limits = {"install": 1, "build": 1, "test": 1, "lint": 1, "check": 1, "deploy": 1}
+        if self.job_nice is None:
+            self.job_nice = {"default": 10, "dev": 0}
+
+config = Config()
+
+# Logging setup
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class LogBuffer:
+    """Fixed-capacity ring buffer of log entries.
+
+    Every entry gets a monotonically increasing sequence number, so pollers
+    can pass the cursor they were given last time and only receive new
+    entries. Appends are O(1) regardless of how full the buffer is.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries: List[Optional[Dict]] = [None] * capacity
+        self.next_seq = 0
+        self.cond = threading.Condition()
+
+    def __len__(self) -> int:
+        return min(self.next_seq, self.capacity)
+
+    def append(self, entry: Dict) -> int:
+        with self.cond:
+            seq = self.next_seq
+            entry["seq"] = seq
+            self.entries[seq % self.capacity] = entry
+            self.next_seq = seq + 1
+            self.cond.notify_all()
+        return seq
+
+    @property
+    def oldest_seq(self) -> int:
+        return max(0, self.next_seq - self.capacity)
+
+    def tail(self, limit: int) -> List[Dict]:
+        """The last limit entries, oldest first"""
+        with self.cond:
+            start = max(self.oldest_seq, self.next_seq - limit) if limit else self.oldest_seq
+            return [self.entries[seq % self.capacity] for seq in range(start, self.next_seq)]
+
+    def since(self, cursor: int, limit: int = 100, levels: Optional[set] = None) -> Dict:
+        """Up to limit entries with seq >= cursor, plus the cursor to use next"""
+        with self.cond:
+            start = max(cursor, self.oldest_seq)
+            entries = []
+            seq = start
+            while seq < self.next_seq and len(entries) < limit:
+                entry = self.entries[seq % self.capacity]
+                if not levels or entry["level"] in levels:
+                    entries.append(entry)
+                seq += 1
+            return {
+                "logs": entries,
+                "cursor": seq,
+                "dropped": start - cursor if cursor < start else 0
+            }
+
+    def wait(self, cursor: int, timeout: float, limit: int = 100,
+             levels: Optional[set] = None) -> Dict:
+        """Long-poll: block until matching entries after cursor exist or timeout"""
+        deadline = time.monotonic() + timeout
+        result = self.since(cursor, limit, levels)
+        while not result["logs"]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with self.cond:
+                if self.next_seq <= result["cursor"]:
+                    self.cond.wait(remaining)
+            result = self.since(result["cursor"], limit, levels)
+        return result
+
+async def read_lines(reader: asyncio.StreamReader, on_line: Callable[[str], None]):
+    """Read a pipe incrementally, emitting one decoded line at a time"""
+    pending = b""
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            on_line(line.decode('utf-8', 'replace').rstrip('\r'))
+        # Never let a single unterminated line grow without bound
+        if len(pending) > config.max_line_length:
+            on_line(pending[:config.max_line_length].decode('utf-8', 'replace'))
+            pending = b""
+    if pending:
+        on_line(pending.decode('utf-8', 'replace').rstrip('\r'))
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+# Read once at import, while no other thread can create files under the temporary umask
+UMASK = os.umask(0o022)
+os.umask(UMASK)
+
+def read_proc_stat(pid: int) -> Optional[Dict]:
+    """Parse /proc/<pid>/stat; None if the process is gone or /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces, so split after its closing parenthesis
+    fields = data[data.rindex(')') + 2:].split()
+    return {
+        "pid": pid,
+        "name": data[data.index('(') + 1:data.rindex(')')],
+        "ppid": int(fields[1]),
+        "pgid": int(fields[2]),
+        "cpu_ticks": int(fields[11]) + int(fields[12]),
+        "start_ticks": int(fields[19]),
+        "rss": int(fields[21]) * PAGE_SIZE
+    }
+
+def process_tree(pid: int) -> List[Dict]:
+    """Stats for pid and all of its descendants"""
+    children: Dict[int, List[Dict]] = {}
+    root = None
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        stat = read_proc_stat(int(entry))
+        if stat is None:
+            continue
+        if stat["pid"] == pid:
+            root = stat
+        children.setdefault(stat["ppid"], []).append(stat)
+    if root is None:
+        return []
+    tree, stack = [], [root]
+    while stack:
+        stat = stack.pop()
+        tree.append(stat)
+        stack.extend(children.get(stat["pid"], []))
+    return tree
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus style"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+class Metrics:
+    """In-process instrumentation exported in Prometheus text format at /metrics.
+
+    Request and command latencies go into histograms; every command run and a
+    periodic sample of process stats (RSS, open fds, event-loop lag) are also
+    kept in bounded in-memory series for trend charts.
+    """
+
+    COMMAND_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.request_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.commands: Dict[Tuple[str, str, str], int] = {}
+        self.command_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.command_runs: deque = deque(maxlen=config.metrics_history)
+        self.samples: deque = deque(maxlen=config.metrics_history)
+        self.loop_lag = 0.0
+        self.loop_lag_max = 0.0
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float):
+        with self.lock:
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.request_latency.get((route, method))
+            if histogram is None:
+                histogram = self.request_latency[(route, method)] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_command(self, project_id: str, kind: str, seconds: float, success: bool):
+        with self.lock:
+            key = (project_id, kind, "success" if success else "failure")
+            self.commands[key] = self.commands.get(key, 0) + 1
+            histogram = self.command_latency.get((project_id, kind))
+            if histogram is None:
+                histogram = self.command_latency[(project_id, kind)] = Histogram(self.COMMAND_BUCKETS)
+            histogram.observe(seconds)
+            self.command_runs.append({"time": time.time(), "project": project_id, "kind": kind,
+                                      "duration": round(seconds, 3), "success": success})
+
+    @staticmethod
+    def process_stats() -> Dict:
+        stat = read_proc_stat(os.getpid())
+        try:
+            open_fds = len(os.listdir("/proc/self/fd"))
+        except OSError:
+            open_fds = None
+        return {
+            "rss": stat["rss"] if stat else None,
+            "cpuSeconds": stat["cpu_ticks"] / CLOCK_TICKS if stat else None,
+            "openFds": open_fds,
+            "threads": threading.active_count()
+        }
+
+    async def sample_forever(self):
+        """Measure event-loop lag once a second and record process stats periodically"""
+        loop = asyncio.get_running_loop()
+        next_sample = 0.0
+        while True:
+            expected = loop.time() + 1.0
+            await asyncio.sleep(1.0)
+            self.loop_lag = max(0.0, loop.time() - expected)
+            self.loop_lag_max = max(self.loop_lag_max, self.loop_lag)
+            if loop.time() >= next_sample:
+                next_sample = loop.time() + config.metrics_sample_interval
+                stats = await asyncio.to_thread(self.process_stats)
+                with self.lock:
+                    self.samples.append({"time": time.time(), **stats,
+                                         "loopLagMax": round(self.loop_lag_max, 4)})
+                    self.loop_lag_max = 0.0
+
+    def history(self, series: str, since: float = 0.0, kind: Optional[str] = None,
+                project_id: Optional[str] = None) -> List[Dict]:
+        with self.lock:
+            entries = list(self.command_runs if series == "commands" else self.samples)
+        return [entry for entry in entries
+                if entry["time"] > since
+                and (kind is None or entry.get("kind") == kind)
+                and (project_id is None or entry.get("project") == project_id)]
+
+    @staticmethod
+    def _labels(**labels) -> str:
+        return ",".join(f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                        for name, value in labels.items())
+
+    def _histogram_lines(self, name: str, histogram: Histogram, **labels) -> List[str]:
+        base = self._labels(**labels)
+        lines = [f'{name}_bucket{{{base},le="{bound}"}} {count}'
+                 for bound, count in zip(histogram.buckets, histogram.counts)]
+        lines.append(f'{name}_bucket{{{base},le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{base}}} {histogram.sum:.6f}')
+        lines.append(f'{name}_count{{{base}}} {histogram.count}')
+        return lines
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        stats = self.process_stats()
+        lines = []
+        
+        def metric(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+        
+        with self.lock:
+            metric("devtool_http_requests_total", "counter", "API requests by route, method and status")
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'devtool_http_requests_total{{{self._labels(route=route, method=method, status=status)}}} {count}')
+            metric("devtool_http_request_duration_seconds", "histogram", "API request latency")
+            for (route, method), histogram in sorted(self.request_latency.items()):
+                lines.extend(self._histogram_lines("devtool_http_request_duration_seconds", histogram,
+                                                   route=route, method=method))
+            metric("devtool_commands_total", "counter", "Commands run by project, kind and result")
+            for (project_id, kind, result), count in sorted(self.commands.items()):
+                lines.append(f'devtool_commands_total{{{self._labels(project=project_id, kind=kind, result=result)}}} {count}')
+            metric("devtool_command_duration_seconds", "histogram", "Command duration (install, build, test, lint, deploy...)")
+            for (project_id, kind), histogram in sorted(self.command_latency.items()):
+                lines.extend(self._histogram_lines("devtool_command_duration_seconds", histogram,
+                                                   project=project_id, kind=kind))
+        
+        process_gauges = {
+            "devtool_process_resident_memory_bytes": ("Resident set size of the backend", stats["rss"]),
+            "devtool_process_cpu_seconds_total": ("CPU time used by the backend", stats["cpuSeconds"]),
+            "devtool_process_open_fds": ("Open file descriptors", stats["openFds"]),
+            "devtool_process_threads": ("Python threads", stats["threads"]),
+            "devtool_process_start_time_seconds": ("Backend start time (unix)", self.started),
+            "devtool_event_loop_lag_seconds": ("Event loop lag at the last check", self.loop_lag),
+        }
+        for name, (help_text, value) in {**process_gauges, **(gauges or {})}.items():
+            if value is None:
+                continue
+            metric(name, "counter" if name.endswith("_total") else "gauge", help_text)
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def read_meminfo() -> Dict[str, int]:
+    """MemTotal/MemAvailable and friends from /proc/meminfo, in bytes; empty without /proc"""
+    info = {}
+    try:
+        with open("/proc/meminfo", 'r') as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                parts = value.split()
+                if parts:
+                    info[name] = int(parts[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return info
+
+class ResourceGovernor:
+    """Limits for every process tree the backend spawns.
+
+    Children start in their own session (so the whole group can be signalled)
+    with a nice level, a background I/O priority and optional RLIMIT_CPU.
+    Memory is capped by watching each tree's RSS through /proc rather than
+    with RLIMIT_AS, which V8 trips over because it reserves far more address
+    space than it uses; a tree over its cap is terminated as a whole. New
+    commands wait while MemAvailable is low, unless nothing governed is
+    running that could free memory.
+    """
+
+    IOPRIO_SYSCALLS = {"x86_64": 251, "aarch64": 30, "armv7l": 314, "armv8l": 314, "i686": 289, "i386": 289}
+    IOPRIO_BEST_EFFORT_LOWEST = (2 << 13) | 7
+    KILL_GRACE = 5.0
+
+    def __init__(self):
+        self.jobs: Dict[int, Dict] = {}  # root pid -> tracked tree
+        self.monitor: Optional[asyncio.Task] = None
+        self.waiting = 0
+        self.killed = 0
+        self.libc = None
+
+    def memory_limit(self) -> Optional[int]:
+        total = read_meminfo().get("MemTotal")
+        if not total or not config.job_memory_percent:
+            return None
+        return int(total * config.job_memory_percent / 100)
+
+    def _ioprio(self, which: int, who: int):
+        syscall = self.IOPRIO_SYSCALLS.get(os.uname().machine)
+        if not syscall:
+            return
+        if self.libc is None:
+            self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.libc.syscall(syscall, which, who, self.IOPRIO_BEST_EFFORT_LOWEST)
+
+    def _limit(self, pid: int, job: Dict, group: bool = False):
+        """Apply the job's nice level, I/O priority and CPU rlimit to a process (or its whole group).
+
+        Done from the backend right after spawning rather than in a
+        preexec_fn: running Python between fork and exec isn't safe with the
+        HTTP, event loop and history threads around. Processes forked before
+        this ran are caught by the monitor's next pass.
+        """
+        try:
+            if job["nice"] > 0:
+                os.setpriority(os.PRIO_PGRP if group else os.PRIO_PROCESS, pid, job["nice"])
+                self._ioprio(2 if group else 1, pid)  # IOPRIO_WHO_PGRP / IOPRIO_WHO_PROCESS
+            if job["cpuSeconds"]:
+                resource.prlimit(pid, resource.RLIMIT_CPU, (job["cpuSeconds"], job["cpuSeconds"] + 10))
+        except (OSError, ValueError):
+            pass  # already gone, or not ours to change
+
+    async def admit(self, kind: str, log: Callable[..., None]):
+        """Wait until there is enough free memory to start another command"""
+        waited = False
+        while self.jobs:
+            available = read_meminfo().get("MemAvailable")
+            if available is None or available >= config.min_available_memory:
+                break
+            if not waited:
+                log(f"⏳ Low memory ({available // (1024 * 1024)} MB available): {kind} waits for a running command")
+                waited = True
+                self.waiting += 1
+            await asyncio.sleep(1.0)
+        if waited:
+            self.waiting -= 1
+
+    def track(self, pid: int, kind: str, name: str, log: Callable[..., None]) -> Dict:
+        """Start watching the tree rooted at pid (the leader of its own process group)"""
+        # Niceness is absolute: relative to the backend's own, capped at the lowest priority
+        nice = config.job_nice.get(kind, config.job_nice.get("default", 0))
+        base = os.getpriority(os.PRIO_PROCESS, 0)
+        job = {"pid": pid, "kind": kind, "name": name, "log": log, "limit": self.memory_limit(),
+               "nice": min(19, base + nice) if nice > 0 else 0, "cpuSeconds": config.job_cpu_seconds,
+               "members": {}, "rss": 0, "peakRss": 0, "killed": None, "started": time.monotonic()}
+        self._limit(pid, job, group=True)
+        self.jobs[pid] = job
+        if self.monitor is None or self.monitor.done():
+            self.monitor = asyncio.get_running_loop().create_task(self._monitor())
+        return job
+
+    def untrack(self, pid: int) -> Optional[Dict]:
+        return self.jobs.pop(pid, None)
+
+    def signal(self, pid: int, sig: int):
+        """Signal pid's process group and any descendants that moved to another group"""
+        try:
+            os.killpg(pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+        job = self.jobs.get(pid)
+        members = dict(job["members"]) if job else {}
+        members.update({stat["pid"]: stat["start_ticks"] for stat in process_tree(pid)})
+        for member, start_ticks in members.items():
+            stat = read_proc_stat(member)
+            # Same start time, so the pid wasn't reused; group members were signalled above
+            if member != pid and stat and stat["start_ticks"] == start_ticks and stat["pgid"] != pid:
+                try:
+                    os.kill(member, sig)
+                except (ProcessLookupError, PermissionError):
+                    pass
+
+    async def kill(self, pid: int, process: Optional[asyncio.subprocess.Process] = None,
+                   grace: Optional[float] = None) -> bool:
+        """SIGTERM the whole tree, SIGKILL it after a grace period; returns False if it had to be killed"""
+        self.signal(pid, signal.SIGTERM)
+        if process is None:
+            return True
+        try:
+            await asyncio.wait_for(process.wait(), self.KILL_GRACE if grace is None else grace)
+            graceful = True
+        except asyncio.TimeoutError:
+            graceful = False
+        # The leader may exit on SIGTERM while children ignore it
+        self.signal(pid, signal.SIGKILL)
+        await process.wait()
+        return graceful
+
+    def _sample(self):
+        """Update RSS for every tracked tree with a single pass over /proc"""
+        children: Dict[int, List[Dict]] = {}
+        stats: Dict[int, Dict] = {}
+        try:
+            entries = os.listdir("/proc")
+        except OSError:
+            return
+        for entry in entries:
+            if entry.isdigit():
+                stat = read_proc_stat(int(entry))
+                if stat:
+                    stats[stat["pid"]] = stat
+                    children.setdefault(stat["ppid"], []).append(stat)
+        for pid, job in list(self.jobs.items()):
+            # Descendants orphaned since the last pass were reparented away, but still count
+            roots = [pid] + [member for member, start_ticks in job["members"].items()
+                             if member in stats and stats[member]["start_ticks"] == start_ticks]
+            tree, stack = {}, [stats[root] for root in roots if root in stats]
+            while stack:
+                stat = stack.pop()
+                if stat["pid"] not in tree:
+                    tree[stat["pid"]] = stat
+                    stack.extend(children.get(stat["pid"], []))
+            for member in tree.keys() - job["members"].keys():
+                if member != pid:
+                    self._limit(member, job)
+            job["members"] = {member: stat["start_ticks"] for member, stat in tree.items()}
+            job["rss"] = sum(stat["rss"] for stat in tree.values())
+            job["peakRss"] = max(job["peakRss"], job["rss"])
+
+    async def _monitor(self):
+        loop = asyncio.get_running_loop()
+        while self.jobs:
+            await asyncio.to_thread(self._sample)
+            for pid, job in list(self.jobs.items()):
+                if job["limit"] and job["rss"] > job["limit"] and not job["killed"]:
+                    job["killed"] = (f"memory limit: {job['rss'] // (1024 * 1024)} MB RSS > "
+                                     f"{job['limit'] // (1024 * 1024)} MB")
+                    job["log"](f"🛑 Killing {job['name']} ({job['killed']})", "error")
+                    self.killed += 1
+                    self.signal(pid, signal.SIGTERM)
+                    loop.call_later(self.KILL_GRACE, self._kill_if_tracked, pid)
+            await asyncio.sleep(1.0)
+
+    def _kill_if_tracked(self, pid: int):
+        # Once untracked the leader has been reaped and its pid may be reused
+        if pid in self.jobs:
+            self.signal(pid, signal.SIGKILL)
+
+    def stats(self) -> Dict:
+        meminfo = read_meminfo()
+        return {
+            "memTotal": meminfo.get("MemTotal"),
+            "memAvailable": meminfo.get("MemAvailable"),
+            "minAvailable": config.min_available_memory,
+            "jobMemoryLimit": self.memory_limit(),
+            "waiting": self.waiting,
+            "killed": self.killed,
+            "jobs": [{"pid": job["pid"], "kind": job["kind"], "name": job["name"], "rss": job["rss"],
+                      "peakRss": job["peakRss"], "processes": len(job["members"]),
+                      "uptime": round(time.monotonic() - job["started"], 1)} for job in self.jobs.values()]
+        }
+
+governor = ResourceGovernor()
+
+class ManagedProcess:
+    """Supervises a long-running child process such as the dev server.
+
+    Both pipes are drained continuously into a bounded LogBuffer so the child
+    can never block on a full pipe, and its output is scanned for the URL it
+    is listening on.
+    """
+
+    ANSI_RE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+    URL_RE = re.compile(r'(https?://(?:localhost|127\.0\.0\.1|0\.0\.0\.0|\[[0-9a-fA-F:]+\]|[\w.-]+):(\d{2,5})[^\s]*)')
+
+    def __init__(self, name: str, args: List[str], cwd: str, log: Callable[[str, str], None]):
+        self.name = name
+        self.args = args
+        self.cwd = cwd
+        self.log = log
+        self.logs = LogBuffer(config.dev_log_lines)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.started_at: Optional[float] = None
+        self.url: Optional[str] = None
+        self.port: Optional[int] = None
+        self.ready = asyncio.Event()
+        self.tasks: List[asyncio.Task] = []
+        self._cpu_sample = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.args,
+            cwd=self.cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+        governor.track(self.process.pid, "dev", self.name, self.log)
+        self.started_at = time.time()
+        loop = asyncio.get_running_loop()
+        self.tasks = [
+            loop.create_task(read_lines(self.process.stdout, self._collector("stdout"))),
+            loop.create_task(read_lines(self.process.stderr, self._collector("stderr"))),
+            loop.create_task(self._watch_exit())
+        ]
+
+    def _collector(self, stream: str):
+        def on_line(line: str):
+            line = self.ANSI_RE.sub('', line)
+            self.logs.append({"timestamp": datetime.now().isoformat(), "level": stream, "message": line})
+            if self.url is None:
+                match = self.URL_RE.search(line)
+                if match:
+                    self.url, self.port = match.group(1).rstrip('/'), int(match.group(2))
+                    self.ready.set()
+                    self.log(f"🌐 {self.name} ready at {self.url}", "info")
+        return on_line
+
+    async def _watch_exit(self):
+        returncode = await self.process.wait()
+        # npm is gone; don't leave its node children holding the port
+        governor.signal(self.process.pid, signal.SIGTERM)
+        governor.untrack(self.process.pid)
+        level = "info" if returncode in (0, -15) else "error"
+        self.log(f"⏹️ {self.name} exited with code {returncode}", level)
+
+    async def wait_ready(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self, timeout: float = 5.0) -> bool:
+        """Terminate the whole process tree; returns False if it had to be killed"""
+        if not self.running:
+            return True
+        try:
+            return await governor.kill(self.process.pid, self.process, timeout)
+        finally:
+            # Orphaned grandchildren may still hold the pipes open; don't wait on them forever
+            _, pending = await asyncio.wait(self.tasks, timeout=1.0)
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        """Live stats for the whole process tree, read from /proc"""
+        data = {
+            "name": self.name,
+            "running": self.running,
+            "pid": self.process.pid if self.process else None,
+            "returncode": self.process.returncode if self.process else None,
+            "url": self.url,
+            "port": self.port,
+            "uptime": round(time.time() - self.started_at, 1) if self.started_at and self.running else 0,
+            "logLines": self.logs.next_seq
+        }
+        if not self.running:
+            return data
+        
+        tree = process_tree(self.process.pid)
+        if tree:
+            cpu_ticks = sum(stat["cpu_ticks"] for stat in tree)
+            now = time.monotonic()
+            cpu_percent = None
+            if self._cpu_sample:
+                last_ticks, last_time = self._cpu_sample
+                elapsed = now - last_time
+                if elapsed > 0:
+                    cpu_percent = round((cpu_ticks - last_ticks) / CLOCK_TICKS / elapsed * 100, 1)
+            self._cpu_sample = (cpu_ticks, now)
+            data.update({
+                "processes": len(tree),
+                "rss": sum(stat["rss"] for stat in tree),
+                "cpuSeconds": round(cpu_ticks / CLOCK_TICKS, 2),
+                "cpuPercent": cpu_percent
+            })
+        return data
+
+class ProjectIndex:
+    """Cached index of the files in a project tree.
+
+    Directories are listed with os.scandir and remembered together with their
+    mtime. A refresh stats every directory but only re-lists the ones whose
+    mtime changed, so repeated lookups cost milliseconds. Ignored directories
+    such as node_modules are recorded but never descended into.
+    """
+
+    IGNORED_DIRS = {"node_modules", ".git", "dist", "build", ".devtool", ".next", ".nuxt",
+                    ".svelte-kit", ".angular", ".cache", "coverage"}
+
+    def __init__(self, root: Path, ignored: Optional[set] = None):
+        self.root = root
+        self.ignored = self.IGNORED_DIRS if ignored is None else ignored
+        # relative dir -> (mtime_ns, files, subdirs, ignored subdirs)
+        self.dirs: Dict[str, Tuple[int, List[str], List[str], List[str]]] = {}
+        self.lock = threading.Lock()
+
+    def _list(self, path: str) -> Tuple[List[str], List[str], List[str]]:
+        files, subdirs, ignored = [], [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    (ignored if entry.name in self.ignored else subdirs).append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+        return files, subdirs, ignored
+
+    def refresh(self) -> "ProjectIndex":
+        """Bring the index up to date, re-listing only directories that changed"""
+        root = str(self.root)
+        with self.lock:
+            fresh = {}
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                path = f"{root}/{rel}" if rel else root
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                cached = self.dirs.get(rel)
+                if cached and cached[0] == mtime:
+                    entry = cached
+                else:
+                    try:
+                        entry = (mtime, *self._list(path))
+                    except OSError:
+                        continue
+                fresh[rel] = entry
+                prefix = f"{rel}/" if rel else ""
+                stack.extend(prefix + name for name in entry[2])
+            self.dirs = fresh
+        return self
+
+    def files(self) -> List[str]:
+        """Relative paths of all indexed files"""
+        return [f"{rel}/{name}" if rel else name
+                for rel, (_, files, _, _) in self.dirs.items() for name in files]
+
+    def file_count(self) -> int:
+        return sum(len(entry[1]) for entry in self.dirs.values())
+
+    def ignored_dirs(self) -> List[str]:
+        return sorted(f"{rel}/{name}" if rel else name
+                      for rel, entry in self.dirs.items() for name in entry[3])
+
+def detect_framework(deps: Dict) -> str:
+    """Project framework from its merged dependencies and devDependencies"""
+    if "react" in deps:
+        if "next" in deps:
+            return "nextjs"
+        return "react"
+    elif "vue" in deps:
+        if "nuxt" in deps or any("@nuxt" in name for name in deps):
+            return "nuxt"
+        return "vue"
+    elif "@angular/core" in deps:
+        return "angular"
+    elif "svelte" in deps:
+        return "svelte"
+    else:
+        return "unknown"
+
+class PackageManifest:
+    """A project's package.json, parsed once and re-read only when its (mtime, size) changes.
+
+    Scripts, dependency counts and the framework are worked out when the file
+    is parsed, so endpoints only read memory. Monorepo workspaces (the
+    "workspaces" field or pnpm-workspace.yaml) resolve to manifests of their
+    own; the patterns are globbed again only when the root manifest, the pnpm
+    file or a pattern's base directory changes.
+    """
+
+    GLOB_CHARS = re.compile(r'[*?\[]')
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = project_dir
+        self.path = project_dir / "package.json"
+        self.lock = threading.Lock()
+        self.stamp: Optional[Tuple[int, int]] = None
+        self.data: Dict = {}
+        self.scripts: Dict[str, str] = {}
+        self.dependencies: Dict[str, str] = {}
+        self.dev_dependencies: Dict[str, str] = {}
+        self.framework = "unknown"
+        self.members: Dict[str, "PackageManifest"] = {}  # relative dir -> manifest
+        self.members_signature: Optional[Tuple] = None
+        self.patterns: List[str] = []
+        self.patterns_stamp: Optional[Tuple] = None  # (package.json stamp, pnpm-workspace.yaml mtime)
+
+    def load(self) -> "PackageManifest":
+        """Revalidate against package.json; raises OSError or ValueError when it can't be read"""
+        st = os.stat(self.path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            if stamp != self.stamp:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if not isinstance(data, dict):
+                    raise ValueError("package.json is not a JSON object")
+                self.data = data
+                self.scripts = data.get("scripts") or {}
+                self.dependencies = data.get("dependencies") or {}
+                self.dev_dependencies = data.get("devDependencies") or {}
+                self.framework = detect_framework({**self.dependencies, **self.dev_dependencies})
+                self.stamp = stamp
+        return self
+
+    def script(self, name: str) -> Optional[str]:
+        return self.scripts.get(name)
+
+    def _stamp(self, path: Path) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _patterns(self) -> List[str]:
+        """Workspace patterns, re-read only when package.json or pnpm-workspace.yaml changes"""
+        pnpm = self.project_dir / "pnpm-workspace.yaml"
+        stamp = (self.stamp, self._stamp(pnpm))
+        if stamp == self.patterns_stamp:
+            return self.patterns
+        patterns = self.data.get("workspaces") or []
+        if isinstance(patterns, dict):
+            patterns = patterns.get("packages") or []
+        patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        try:
+            # Only the "packages:" list of pnpm-workspace.yaml matters; no YAML parser needed
+            with open(pnpm, 'r') as f:
+                in_packages = False
+                for line in f:
+                    stripped = line.split("#", 1)[0].strip()
+                    if line[:1] not in (" ", "\t", "-"):
+                        in_packages = stripped.startswith("packages:")
+                    elif in_packages and stripped.startswith("-"):
+                        patterns.append(stripped[1:].strip().strip("'\""))
+        except OSError:
+            pass
+        patterns = [pattern.strip().rstrip("/") for pattern in patterns if isinstance(pattern, str)]
+        self.patterns = [pattern[2:] if pattern.startswith("./") else pattern for pattern in patterns if pattern]
+        self.patterns_stamp = stamp
+        return self.patterns
+
+    def workspaces(self) -> List["PackageManifest"]:
+        """Manifests of the workspace members, in path order"""
+        self.load()
+        patterns = self._patterns()
+        includes = [p for p in patterns if not p.startswith("!")]
+        excludes = [p[1:] for p in patterns if p.startswith("!")]
+        bases = []
+        for pattern in includes:
+            parts = pattern.split("/")
+            fixed = next((i for i, part in enumerate(parts) if self.GLOB_CHARS.search(part)), len(parts))
+            bases.append(self._stamp(self.project_dir.joinpath(*parts[:fixed])))
+        signature = (self.patterns_stamp, tuple(patterns), tuple(bases))
+        
+        with self.lock:
+            if signature != self.members_signature:
+                found = {}
+                for pattern in includes:
+                    for path in self.project_dir.glob(pattern):
+                        rel = path.relative_to(self.project_dir).as_posix()
+                        if "node_modules" in path.parts or not (path / "package.json").is_file() \
+                                or any(fnmatch.fnmatch(rel, exclude) for exclude in excludes):
+                            continue
+                        found[rel] = self.members.get(rel) or PackageManifest(path)
+                self.members = dict(sorted(found.items()))
+                self.members_signature = signature
+            members = list(self.members.values())
+        
+        loaded = []
+        for manifest in members:
+            try:
+                loaded.append(manifest.load())
+            except (OSError, ValueError):
+                continue
+        return loaded
+
+    def summary(self, root: Path) -> Dict:
+        return {
+            "name": self.data.get("name", "Unknown"),
+            "version": self.data.get("version", "0.0.0"),
+            "path": self.project_dir.relative_to(root).as_posix(),
+            "framework": self.framework,
+            "scripts": sorted(self.scripts)
+        }
+
+def compressed_sizes(path: str, brotli_quality: int) -> Tuple[int, Optional[int]]:
+    """gzip and brotli sizes of a file; runs in a worker process"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    gzip_size = len(gzip.compress(data, compresslevel=9))
+    brotli_size = len(brotli.compress(data, quality=brotli_quality)) if brotli else None
+    return gzip_size, brotli_size
+
+_worker_pool: Optional[Executor] = None
+
+def worker_pool() -> Executor:
+    """Process pool for CPU-bound work (compression, search indexing), or threads
+    where the platform has no sem_open (Android)"""
+    global _worker_pool
+    if _worker_pool is None:
+        workers = min(4, os.cpu_count() or 1)
+        try:
+            # Not fork: by now the HTTP, event loop and history writer threads are running
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _worker_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        except (ImportError, OSError, NotImplementedError, ValueError):
+            _worker_pool = ThreadPoolExecutor(max_workers=workers)
+    return _worker_pool
+
+def file_trigrams(path: str, max_bytes: int) -> Optional[str]:
+    """Distinct case-folded trigrams of a text file, concatenated; None for binary or
+    oversized files. Runs in a worker process."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(max_bytes + 1)
+    except OSError:
+        return None
+    if len(data) > max_bytes or b'\0' in data[:8192]:
+        return None
+    text = data.decode('utf-8', 'replace').casefold()
+    return "".join({text[i:i + 3] for i in range(len(text) - 2)})
+
+def required_literals(pattern: str) -> List[str]:
+    """Literal runs every match of a regex must contain, used to pick candidate files.
+
+    Deliberately conservative: anything inside groups or classes, optional
+    characters and alternations contribute nothing, so the candidate set is
+    always a superset of the files that really match.
+    """
+    runs, current = [], ""
+    depth = 0
+    i = 0
+    
+    def flush():
+        nonlocal current
+        if current:
+            runs.append(current)
+        current = ""
+    
+    while i < len(pattern):
+        c = pattern[i]
+        literal = None
+        if c == '\\':
+            escaped = pattern[i + 1:i + 2]
+            if escaped and not escaped.isalnum():
+                literal = escaped
+            elif escaped in ('n', 't'):
+                literal = '\n' if escaped == 'n' else '\t'
+            i += 2
+            # Skip the whole argument of \xNN, \uNNNN, \N{...}, \p{..}, \0NN and \12
+            # so its characters aren't taken for literals that follow the escape
+            if pattern[i:i + 1] == '{' and escaped in ('x', 'u', 'N', 'p', 'P'):
+                i = pattern.find('}', i) + 1 or len(pattern)
+            elif escaped in ('x', 'u', 'U'):
+                width = {'x': 2, 'u': 4, 'U': 8}[escaped]
+                while width and i < len(pattern) and pattern[i] in '0123456789abcdefABCDEF':
+                    i, width = i + 1, width - 1
+            elif escaped in ('p', 'P', 'c'):
+                i += 1
+            elif escaped.isdigit():
+                while pattern[i:i + 1].isdigit():
+                    i += 1
+        elif c == '[':
+            i += 2 if pattern[i + 1:i + 2] == ']' else 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        elif c in '*?{':
+            # The previous character was optional after all
+            if depth == 0:
+                current = current[:-1]
+            if c == '{':
+                i = pattern.find('}', i) + 1 or len(pattern)
+            else:
+                i += 1
+        elif c == '|' and depth == 0:
+            # A top-level alternation means no single literal is required
+            return []
+        else:
+            if c == '(':
+                depth += 1
+            elif c == ')':
+                depth -= 1
+            elif c not in '.^$+':
+                literal = c
+            i += 1
+        if literal is not None and depth == 0:
+            current += literal
+        else:
+            flush()
+    flush()
+    return [run.casefold() for run in runs if len(run) >= 3]
+
+class SearchIndex:
+    """Trigram index over the project's text files for fast code search.
+
+    Each file is reduced to its set of case-folded trigrams; the inverted index
+    maps a trigram to a bitmap (a Python int) of file ids, so a query is the AND
+    of a few bitmaps followed by a real regex scan of the candidate files only.
+    Files are re-indexed when their (mtime, size) changes, in the worker pool
+    when there are many, and the per-file trigrams are kept in
+    .devtool/search-index.json so a restart doesn't re-read the whole tree.
+    """
+
+    POOL_THRESHOLD = 16  # fewer stale files than this are indexed in-process
+
+    def __init__(self, project_dir: Path, index: ProjectIndex):
+        self.project_dir = project_dir
+        self.index = index
+        self.path = project_dir / ".devtool" / "search-index.json"
+        # relative path -> (mtime_ns, size, trigrams or None for binary/oversized)
+        self.files: Dict[str, Tuple[int, int, Optional[str]]] = {}
+        self.ids: Dict[str, int] = {}
+        self.free_ids: List[int] = []
+        self.postings: Dict[str, int] = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def _load(self):
+        self.loaded = True
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            return
+        for rel, (mtime, size, trigrams) in stored.items():
+            self._add(rel, (mtime, size, trigrams))
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "files": self.files}, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
+
+    def _add(self, rel: str, entry: Tuple[int, int, Optional[str]]):
+        self.files[rel] = entry
+        trigrams = entry[2]
+        if not trigrams:
+            return
+        file_id = self.free_ids.pop() if self.free_ids else len(self.ids) + len(self.free_ids)
+        self.ids[rel] = file_id
+        bit = 1 << file_id
+        postings = self.postings
+        for i in range(0, len(trigrams), 3):
+            trigram = trigrams[i:i + 3]
+            postings[trigram] = postings.get(trigram, 0) | bit
+    
+    def _remove(self, rel: str):
+        entry = self.files.pop(rel, None)
+        file_id = self.ids.pop(rel, None)
+        if entry is None or file_id is None:
+            return
+        mask = ~(1 << file_id)
+        trigrams = entry[2]
+        for i in range(0, len(trigrams), 3):
+            trigram = trigrams[i:i + 3]
+            remaining = self.postings[trigram] & mask
+            if remaining:
+                self.postings[trigram] = remaining
+            else:
+                del self.postings[trigram]
+        self.free_ids.append(file_id)
+
+    def update(self) -> Dict:
+        """Re-index files added, changed or removed since the last update"""
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            root = str(self.project_dir)
+            current = {}
+            for rel in self.index.refresh().files():
+                try:
+                    st = os.stat(f"{root}/{rel}")
+                except OSError:
+                    continue
+                current[rel] = (st.st_mtime_ns, st.st_size)
+            
+            stale = [rel for rel, meta in current.items() if self.files.get(rel, (None, None))[:2] != meta]
+            removed = [rel for rel in self.files if rel not in current]
+            if stale:
+                max_bytes = config.search_max_file_bytes
+                paths = [f"{root}/{rel}" for rel in stale]
+                if len(stale) >= self.POOL_THRESHOLD:
+                    trigrams = list(worker_pool().map(file_trigrams, paths, [max_bytes] * len(paths),
+                                                      chunksize=32))
+                else:
+                    trigrams = [file_trigrams(path, max_bytes) for path in paths]
+                for rel in stale:
+                    self._remove(rel)
+                for rel, grams in zip(stale, trigrams):
+                    self._add(rel, (*current[rel], grams))
+            for rel in removed:
+                self._remove(rel)
+            if stale or removed:
+                self._save()
+            return {"indexed": len(self.ids), "updated": len(stale), "removed": len(removed)}
+
+    def candidates(self, literals: List[str]) -> List[str]:
+        """Files containing every trigram of the literals (all indexed files if there are none)"""
+        trigrams = {run[i:i + 3] for run in literals for i in range(len(run) - 2)}
+        with self.lock:
+            if not trigrams:
+                return sorted(self.ids)
+            mask = -1
+            for trigram in trigrams:
+                mask &= self.postings.get(trigram, 0)
+                if not mask:
+                    return []
+            paths = {file_id: rel for rel, file_id in self.ids.items()}
+        found = []
+        while mask:
+            low = mask & -mask
+            found.append(paths[low.bit_length() - 1])
+            mask ^= low
+        return sorted(found)
+
+    def search(self, query: str, regex: bool = False, case_sensitive: bool = False,
+               glob: Optional[str] = None, stats: Optional[Dict] = None):
+        """Yield matches in file order as {file, line, column, text}"""
+        pattern = re.compile(query if regex else re.escape(query),
+                             re.MULTILINE | (0 if case_sensitive else re.IGNORECASE))
+        literals = required_literals(query) if regex else [query.casefold()]
+        files = self.candidates(literals)
+        if glob:
+            files = [rel for rel in files if fnmatch.fnmatch(rel, glob)]
+        if stats is not None:
+            stats["candidates"] = len(files)
+            stats["indexedFiles"] = len(self.ids)
+        
+        root = str(self.project_dir)
+        for rel in files:
+            try:
+                with open(f"{root}/{rel}", encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except OSError:
+                continue
+            line, line_start = 1, 0
+            for match in pattern.finditer(text):
+                start = match.start()
+                if match.end() == start:
+                    continue
+                line += text.count('\n', line_start, start)
+                line_start = text.rfind('\n', 0, start) + 1
+                line_end = text.find('\n', start)
+                yield {
+                    "file": rel,
+                    "line": line,
+                    "column": start - line_start + 1,
+                    "text": text[line_start:line_end if line_end != -1 else len(text)][:config.max_line_length]
+                }
+
+
+class BundleAnalyzer:
+    """Single-pass bundle analysis with cached compressed sizes.
+
+    gzip/brotli sizes are cached per file by (size, mtime), so re-analysing
+    after a small rebuild only recompresses the files that changed.
+    """
+
+    HASH_RE = re.compile(r'^(?P<stem>.+)[.-](?P<hash>[A-Za-z0-9_]{8,})'
+                         r'(?P<ext>(?:\.chunk)?\.[A-Za-z0-9]+(?:\.map)?)$')
+    COMPRESSIBLE = {".js", ".mjs", ".cjs", ".css", ".html", ".htm", ".json", ".svg",
+                    ".txt", ".xml", ".map", ".wasm", ".webmanifest", ".ico"}
+    PRECOMPRESSED = (".gz", ".br")
+    ASSET_TYPES = {
+        ".js": "script", ".mjs": "script", ".cjs": "script",
+        ".css": "style",
+        ".html": "document", ".htm": "document",
+        ".map": "sourcemap",
+        ".json": "data", ".webmanifest": "data", ".wasm": "wasm",
+        ".png": "image", ".jpg": "image", ".jpeg": "image", ".gif": "image",
+        ".webp": "image", ".avif": "image", ".svg": "image", ".ico": "image",
+        ".woff": "font", ".woff2": "font", ".ttf": "font", ".otf": "font", ".eot": "font"
+    }
+
+    def __init__(self):
+        # relative path -> (size, mtime_ns, gzip size, brotli size)
+        self.cache: Dict[str, Tuple[int, int, Optional[int], Optional[int]]] = {}
+
+    @classmethod
+    def chunk_name(cls, rel_path: str) -> str:
+        """Path with the content hash stripped: assets/index-BfZ0k1a2.js -> assets/index.js"""
+        directory, _, name = rel_path.rpartition("/")
+        match = cls.HASH_RE.match(name)
+        if match and cls.is_hash(match.group("hash")):
+            name = match.group("stem") + match.group("ext")
+        return f"{directory}/{name}" if directory else name
+
+    @staticmethod
+    def is_hash(part: str) -> bool:
+        """Whether a name part looks like a content hash: hex or mixed case, with a digit.
+
+        Keeps android-chrome-192x192.png and logo-original.svg from being
+        taken for hashed copies of one asset.
+        """
+        if not re.search(r'[0-9]', part):
+            return False
+        return bool(re.fullmatch(r'[0-9a-f]+', part) or (re.search(r'[a-z]', part) and re.search(r'[A-Z]', part)))
+
+    @classmethod
+    def asset_type(cls, rel_path: str) -> str:
+        return cls.ASSET_TYPES.get(os.path.splitext(rel_path)[1].lower(), "other")
+
+    @staticmethod
+    def scan(target_dir: Path) -> Tuple[List[Tuple[str, int, int]], int]:
+        """One scandir pass: (relative path, size, mtime_ns) per file, plus precompressed count"""
+        files, precompressed = [], 0
+        stack = [(str(target_dir), "")]
+        while stack:
+            path, prefix = stack.pop()
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, f"{prefix}{entry.name}/"))
+                    elif entry.is_file():
+                        if entry.name.endswith(BundleAnalyzer.PRECOMPRESSED):
+                            precompressed += 1
+                            continue
+                        st = entry.stat()
+                        files.append((prefix + entry.name, st.st_size, st.st_mtime_ns))
+        return files, precompressed
+
+    async def analyze(self, target_dir: Path, top_n: int) -> Dict:
+        files, precompressed = await asyncio.to_thread(self.scan, target_dir)
+        
+        # Only (re)compress files that are new or changed since the last analysis
+        stale = [(rel, size, mtime) for rel, size, mtime in files
+                 if os.path.splitext(rel)[1].lower() in self.COMPRESSIBLE
+                 and self.cache.get(rel, (None, None))[:2] != (size, mtime)]
+        loop = asyncio.get_running_loop()
+        executor = worker_pool()
+        sizes = await asyncio.gather(*(
+            loop.run_in_executor(executor, compressed_sizes, str(target_dir / rel), config.brotli_quality)
+            for rel, _, _ in stale
+        ))
+        current = {rel for rel, _, _ in files}
+        self.cache = {rel: entry for rel, entry in self.cache.items() if rel in current}
+        for (rel, size, mtime), (gzip_size, brotli_size) in zip(stale, sizes):
+            self.cache[rel] = (size, mtime, gzip_size, brotli_size)
+        
+        def transfer(rel: str, size: int) -> Tuple[int, Optional[int]]:
+            cached = self.cache.get(rel)
+            if cached is None:
+                return size, (size if brotli else None)
+            return cached[2], cached[3]
+        
+        def group() -> Dict:
+            return {"count": 0, "size": 0, "gzip": 0, "brotli": 0 if brotli else None}
+        
+        records = []
+        totals = group()
+        by_type: Dict[str, Dict] = {}
+        by_chunk: Dict[str, Dict] = {}
+        for rel, size, _ in files:
+            gzip_size, brotli_size = transfer(rel, size)
+            record = {"path": rel, "size": size, "gzip": gzip_size, "brotli": brotli_size,
+                      "type": self.asset_type(rel), "chunk": self.chunk_name(rel)}
+            records.append(record)
+            for bucket in (totals, by_type.setdefault(record["type"], group()),
+                           by_chunk.setdefault(record["chunk"], group())):
+                bucket["count"] += 1
+                bucket["size"] += size
+                bucket["gzip"] += gzip_size
+                if brotli:
+                    bucket["brotli"] += brotli_size
+        
+        return {
+            "files": records,
+            "top": heapq.nlargest(top_n, records, key=lambda record: record["size"]),
+            "totals": totals,
+            "byType": by_type,
+            "byChunk": by_chunk,
+            "precompressedVariants": precompressed,
+            "recompressed": len(stale)
+        }
+
+class BundleHistory:
+    """Append-only JSONL history of bundle analyses under <project>/.devtool.
+
+    Assets are keyed by chunk name (content hash stripped), so index-a1b2.js
+    and index-c3d4.js from two builds are compared as the same asset.
+    """
+
+    def __init__(self, project_dir: Path):
+        self.path = project_dir / ".devtool" / "bundle-history.jsonl"
+        self.records: Optional[List[Dict]] = None
+
+    def _load(self) -> List[Dict]:
+        if self.records is None:
+            self.records = []
+            if self.path.exists():
+                with open(self.path, 'r') as f:
+                    for line in f:
+                        try:
+                            self.records.append(json.loads(line))
+                        except ValueError:
+                            continue
+        return self.records
+
+    def record(self, analysis: Dict, build_dir: str) -> Dict:
+        """Persist an analysis unless it is identical to the latest one"""
+        records = self._load()
+        assets = {chunk: [group["size"], group["gzip"]] for chunk, group in analysis["byChunk"].items()}
+        if records and records[-1]["assets"] == assets:
+            return records[-1]
+        
+        entry = {
+            "id": records[-1]["id"] + 1 if records else 1,
+            "timestamp": datetime.now().isoformat(),
+            "buildDir": build_dir,
+            "totals": {"size": analysis["totals"]["size"], "gzip": analysis["totals"]["gzip"]},
+            "assets": assets
+        }
+        records.append(entry)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if len(records) > 2 * config.bundle_history_limit:
+            # Compact: rewrite with only the most recent entries
+            del records[:-config.bundle_history_limit]
+            with open(self.path, 'w') as f:
+                f.writelines(json.dumps(r, separators=(',', ':')) + "\n" for r in records)
+        else:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        return entry
+
+    def list(self) -> List[Dict]:
+        return [{key: r[key] for key in ("id", "timestamp", "buildDir", "totals")} for r in self._load()]
+
+    def get(self, build_id: Optional[int]) -> Optional[Dict]:
+        records = self._load()
+        if build_id is None:
+            return records[-1] if records else None
+        if build_id < 0:
+            return records[build_id] if len(records) >= -build_id else None
+        return next((r for r in records if r["id"] == build_id), None)
+
+    def diff(self, from_id: Optional[int] = None, to_id: Optional[int] = None) -> Dict:
+        """Per-asset and total deltas between two builds (default: the one before `to` -> `to`, latest)"""
+        after = self.get(to_id)
+        if from_id is not None:
+            before = self.get(from_id)
+        else:
+            records = self._load()
+            position = next((i for i, r in enumerate(records) if r is after), 0)
+            before = records[position - 1] if position > 0 else None
+        if not before or not after:
+            return {"error": "Need at least two recorded builds to diff"}
+        
+        assets = []
+        for chunk in sorted(set(before["assets"]) | set(after["assets"])):
+            old = before["assets"].get(chunk)
+            new = after["assets"].get(chunk)
+            if old == new:
+                continue
+            old_size, old_gzip = old or (0, 0)
+            new_size, new_gzip = new or (0, 0)
+            assets.append({
+                "asset": chunk,
+                "status": "added" if old is None else "removed" if new is None else "changed",
+                "before": old_size,
+                "after": new_size,
+                "delta": new_size - old_size,
+                "gzipDelta": new_gzip - old_gzip
+            })
+        assets.sort(key=lambda a: abs(a["delta"]), reverse=True)
+        
+        return {
+            "from": before["id"],
+            "to": after["id"],
+            "totalDelta": after["totals"]["size"] - before["totals"]["size"],
+            "gzipDelta": after["totals"]["gzip"] - before["totals"]["gzip"],
+            "assets": assets
+        }
+
+def parse_size(value: Union[str, int]) -> int:
+    """Parse budget sizes such as "170 kB", "1.5MB" or 2048"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kKmMgG]?)[iI]?[bB]?\s*', value)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    multiplier = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}[match.group(2).lower()]
+    return int(float(match.group(1)) * multiplier)
+
+def check_budgets(budgets: List[Dict], build_dir: str, files: List[Dict]) -> List[Dict]:
+    """Check bundlesize-style budgets ([{path, maxSize, compression}]) against analysed files"""
+    violations = []
+    for budget in budgets:
+        pattern = budget.get("path", "").removeprefix("./")
+        limit = parse_size(budget.get("maxSize", 0))
+        compression = budget.get("compression", "gzip")
+        for record in files:
+            if not fnmatch.fnmatch(f"{build_dir}/{record['path']}", pattern):
+                continue
+            size = {"gzip": record["gzip"], "brotli": record["brotli"]}.get(compression, record["size"])
+            if size is not None and size > limit:
+                violations.append({"path": record["path"], "budget": budget.get("path"),
+                                   "compression": compression, "size": size, "maxSize": limit})
+    return violations
+
+def find_output_dir(project_dir: Path) -> Optional[Path]:
+    """The build output directory (dist/ or build/), if one exists"""
+    for name in ("dist", "build"):
+        if (project_dir / name).is_dir():
+            return project_dir / name
+    return None
+
+class BuildCache:
+    """Content fingerprint of the build inputs, used to skip redundant builds.
+
+    Files are re-hashed only when their (size, mtime) changed since the last
+    fingerprint. The inputs are every indexed project file (node_modules,
+    dist, ... are excluded by ProjectIndex), the build script and the
+    environment variables bundlers inline into the output.
+    """
+
+    ENV_PREFIXES = ("VITE_", "REACT_APP_", "NEXT_PUBLIC_", "VUE_APP_", "PUBLIC_", "NG_")
+
+    def __init__(self, project_dir: Path, index: ProjectIndex):
+        self.project_dir = project_dir
+        self.index = index
+        self.state_path = project_dir / ".devtool" / "build-cache.json"
+        self.snapshot_dir = project_dir / ".devtool" / "build-snapshots"
+        self.state: Optional[Dict] = None
+
+    def _load(self) -> Dict:
+        if self.state is None:
+            try:
+                with open(self.state_path, 'r') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {"files": {}, "last": None}
+        return self.state
+
+    def _save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, separators=(',', ':'))
+        os.replace(tmp, self.state_path)
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def fingerprint(self, build_script: str) -> str:
+        """Fingerprint of all build inputs, hashing only files whose stat changed"""
+        state = self._load()
+        known = state["files"]
+        files = {}
+        digest = hashlib.sha256()
+        for rel in sorted(self.index.refresh().files()):
+            try:
+                st = os.stat(self.project_dir / rel)
+            except OSError:
+                continue
+            cached = known.get(rel)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                file_hash = cached[2]
+            else:
+                file_hash = self.hash_file(str(self.project_dir / rel))
+            files[rel] = [st.st_size, st.st_mtime_ns, file_hash]
+            digest.update(f"{rel}\0{file_hash}\n".encode())
+        
+        env = sorted((key, value) for key, value in os.environ.items()
+                     if key == "NODE_ENV" or key.startswith(self.ENV_PREFIXES))
+        digest.update(json.dumps({"script": build_script, "env": env}).encode())
+        state["files"] = files
+        return digest.hexdigest()
+
+    @staticmethod
+    def output_manifest(output_dir: Path) -> str:
+        """Hash of the output tree's paths, sizes and mtimes"""
+        files, _ = BundleAnalyzer.scan(output_dir)
+        return hashlib.sha256(json.dumps(sorted(files)).encode()).hexdigest()
+
+    def is_fresh(self, fingerprint: str) -> bool:
+        """Whether the last successful build used these inputs and its output is intact"""
+        last = self._load().get("last")
+        if not last or last["fingerprint"] != fingerprint:
+            return False
+        output_dir = self.project_dir / last["outputDir"]
+        return output_dir.is_dir() and self.output_manifest(output_dir) == last["manifest"]
+
+    def last_duration(self) -> Optional[float]:
+        last = self._load().get("last")
+        return last.get("duration") if last else None
+
+    def snapshot_path(self, fingerprint: str) -> Path:
+        return self.snapshot_dir / fingerprint[:16]
+
+    def restore_snapshot(self, fingerprint: str) -> bool:
+        """Restore the output saved for this fingerprint, if any"""
+        snapshot = self.snapshot_path(fingerprint)
+        try:
+            with open(snapshot / "snapshot.json", 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        output_dir = self.project_dir / meta["outputDir"]
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        shutil.copytree(snapshot / "output", output_dir)
+        self.record(fingerprint, output_dir, meta.get("duration"), snapshot=False)
+        return True
+
+    def record(self, fingerprint: str, output_dir: Path, duration: Optional[float], snapshot: bool = True):
+        """Remember a successful build, optionally snapshotting its output"""
+        state = self._load()
+        state["last"] = {
+            "fingerprint": fingerprint,
+            "outputDir": output_dir.name,
+            "manifest": self.output_manifest(output_dir),
+            "duration": duration,
+            "timestamp": datetime.now().isoformat()
+        }
+        self._save()
+        if snapshot and config.build_snapshots > 0:
+            self._snapshot(fingerprint, output_dir, duration)
+
+    def _snapshot(self, fingerprint: str, output_dir: Path, duration: Optional[float]):
+        target = self.snapshot_path(fingerprint)
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.copytree(output_dir, target / "output")
+        with open(target / "snapshot.json", 'w') as f:
+            json.dump({"fingerprint": fingerprint, "outputDir": output_dir.name, "duration": duration}, f)
+        
+        # Keep only the most recent snapshots
+        snapshots = sorted(self.snapshot_dir.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in snapshots[config.build_snapshots:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+LOCKFILE_COMMANDS = [
+    ("package-lock.json", "npm ci --prefer-offline --no-audit --no-fund"),
+    ("npm-shrinkwrap.json", "npm ci --prefer-offline --no-audit --no-fund"),
+    ("pnpm-lock.yaml", "pnpm install --frozen-lockfile --prefer-offline"),
+    ("yarn.lock", "yarn install --frozen-lockfile --prefer-offline"),
+]
+INSTALL_MARKER = ".android-dev-tool-install.json"
+
+def install_plan(project_dir: Path) -> Dict:
+    """Pick the install command for the project's lockfile and check the node_modules marker.
+
+    The marker written after each successful install records a hash of
+    package.json plus the lockfile; when it still matches, the install can
+    be skipped.
+    """
+    lockfile, command = None, "npm install --prefer-offline --no-audit --no-fund"
+    for name, lock_command in LOCKFILE_COMMANDS:
+        if (project_dir / name).exists():
+            lockfile, command = name, lock_command
+            break
+    
+    digest = hashlib.sha256()
+    for name in ("package.json", lockfile):
+        if name:
+            with open(project_dir / name, 'rb') as f:
+                digest.update(f.read())
+    
+    marker = None
+    try:
+        with open(project_dir / "node_modules" / INSTALL_MARKER, 'r') as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        pass
+    
+    return {
+        "lockfile": lockfile,
+        "command": command,
+        "hash": digest.hexdigest(),
+        "marker": marker,
+        "upToDate": bool(marker and marker.get("hash") == digest.hexdigest())
+    }
+
+def write_install_marker(project_dir: Path, marker: Dict):
+    path = project_dir / "node_modules" / INSTALL_MARKER
+    if path.parent.is_dir():
+        with open(path, 'w') as f:
+            json.dump(marker, f)
+
+class BuildProfiler:
+    """Timing breakdown of one build, from its streamed output and /proc.
+
+    Every output line is timestamped as it arrives and matched against the
+    progress messages of Vite, Webpack, Next.js and Angular to split the build
+    into phases (transform, bundle, minify, write...) and to time the chunks
+    as they are reported. The npm process tree is sampled for memory and CPU.
+    The result is a summary plus a Chrome trace-event file (chrome://tracing,
+    Perfetto or speedscope) with the phases, chunks and resource counters.
+    """
+
+    # (bundler, pattern, phase); the first match wins, so specific rules go first
+    PHASE_RULES = [
+        ("vite", re.compile(r'^vite v[\d.]+ building'), "startup"),
+        ("vite", re.compile(r'^transforming'), "transform"),
+        ("vite", re.compile(r'^rendering chunks'), "bundle"),
+        ("vite", re.compile(r'^computing gzip size'), "report"),
+        ("webpack", re.compile(r'^\d+% .*(?:asset processing|[Tt]erser|[Mm]inimi[sz]|[Mm]inify)'), "minify"),
+        ("webpack", re.compile(r'^\d+% (?:setup|building|build)\b'), "transform"),
+        ("webpack", re.compile(r'^\d+% (?:sealing|optimizing|chunk|module|record|hashing|code generation)'), "bundle"),
+        ("webpack", re.compile(r'^\d+% (?:emitting|after emitting|done)'), "write"),
+        ("next", re.compile(r'Creating an optimized production build'), "bundle"),
+        ("next", re.compile(r'(?:Linting and checking|Checking) validity of types'), "typecheck"),
+        ("next", re.compile(r'Collecting page data'), "collect"),
+        ("next", re.compile(r'Generating static pages'), "prerender"),
+        ("next", re.compile(r'Finalizing page optimization|Collecting build traces'), "write"),
+        ("angular", re.compile(r'\(phase: setup\)'), "setup"),
+        ("angular", re.compile(r'\(phase: building\)'), "transform"),
+        ("angular", re.compile(r'\(phase: sealing\)'), "bundle"),
+        ("angular", re.compile(r'\(phase: optimization\)'), "minify"),
+        ("angular", re.compile(r'\(phase: emitting\)'), "write"),
+    ]
+    SIZE = r'[\d.,]+\s*[kKMG]?i?B'
+    # (bundler, pattern with file and size groups) for the per-chunk report lines
+    CHUNK_RULES = [
+        ("vite", re.compile(rf'^(\S+\.\w+)\s+({SIZE})(?:\s*│\s*gzip:\s*{SIZE})?')),
+        ("webpack", re.compile(rf'^asset (\S+) ({SIZE})')),
+        ("angular", re.compile(rf'^(\S+\.(?:js|mjs|css))\s*\|\s*[\w-]*\s*\|\s*({SIZE})')),
+        ("next", re.compile(rf'^[┌├└]\s*[○●λƒ◐]?\s*(/\S*)\s+({SIZE})')),
+    ]
+    REPORTED_RE = re.compile(r'(?:built in|compiled successfully in|Compiled successfully in|Time:)\s*([\d.]+)\s*(ms|s)\b'
+                             r'|\[([\d.]+) seconds\]')
+
+    def __init__(self, project_dir: Path):
+        self.dir = project_dir / ".devtool" / "build-profiles"
+        self.t0: Optional[float] = None
+        self.pid: Optional[int] = None
+        self.bundler: Optional[str] = None
+        self.reported: Optional[float] = None
+        self.phases: List[Dict] = []
+        self.chunks: List[Dict] = []
+        self.samples: List[Tuple[float, int, float]] = []  # (t, tree rss, tree cpu %)
+        self.processes: Dict[int, Dict] = {}
+        self.sampler: Optional[asyncio.Task] = None
+
+    def now(self) -> float:
+        return time.monotonic() - self.t0 if self.t0 is not None else 0.0
+
+    def start(self, pid: int):
+        """Called once the build process exists"""
+        self.t0 = time.monotonic()
+        self.pid = pid
+        self._enter("startup", 0.0)
+        self.sampler = asyncio.get_running_loop().create_task(self._sample())
+
+    def _enter(self, phase: str, t: float):
+        if self.phases and self.phases[-1]["name"] == phase:
+            return
+        if self.phases:
+            self.phases[-1]["end"] = t
+        self.phases.append({"name": phase, "start": t, "end": None})
+
+    def on_output(self, stream: str, line: str):
+        t = self.now()
+        line = ManagedProcess.ANSI_RE.sub('', line).strip()
+        for bundler, pattern, phase in self.PHASE_RULES:
+            if (self.bundler in (None, bundler)) and pattern.search(line):
+                self.bundler = bundler
+                self._enter(phase, t)
+                return
+        for bundler, pattern in self.CHUNK_RULES:
+            match = pattern.match(line) if self.bundler in (None, bundler) else None
+            if match:
+                if bundler == "vite":
+                    self._enter("write", t)  # Vite lists chunks as it writes them
+                since = self.chunks[-1]["t"] if self.chunks else self.phases[-1]["start"]
+                self.chunks.append({"file": match.group(1), "size": match.group(2), "t": round(t, 3),
+                                    "sincePrevious": round(t - since, 3)})
+                return
+        reported = self.REPORTED_RE.search(line)
+        if reported:
+            if reported.group(3):
+                self.reported = float(reported.group(3))
+            else:
+                value = float(reported.group(1))
+                self.reported = value / 1000 if reported.group(2) == "ms" else value
+
+    async def _sample(self):
+        last_ticks, last_t = 0, 0.0
+        while True:
+            tree = await asyncio.to_thread(process_tree, self.pid)
+            t = self.now()
+            for stat in tree:
+                seen = self.processes.setdefault(stat["pid"], {"pid": stat["pid"], "name": stat["name"],
+                                                               "cpu_ticks": 0, "peak_rss": 0})
+                seen["cpu_ticks"] = max(seen["cpu_ticks"], stat["cpu_ticks"])
+                seen["peak_rss"] = max(seen["peak_rss"], stat["rss"])
+            if tree:
+                ticks = sum(stat["cpu_ticks"] for stat in tree)
+                cpu = max(0, ticks - last_ticks) / CLOCK_TICKS / (t - last_t) * 100 if t > last_t else 0.0
+                self.samples.append((t, sum(stat["rss"] for stat in tree), round(cpu, 1)))
+                last_ticks, last_t = ticks, t
+            await asyncio.sleep(config.profile_sample_interval)
+
+    async def finish(self, success: bool) -> Dict:
+        """Stop sampling, write the profile and trace files and return the summary"""
+        if self.sampler:
+            self.sampler.cancel()
+            try:
+                await self.sampler
+            except asyncio.CancelledError:
+                pass
+        total = self.now()
+        if self.phases:
+            self.phases[-1]["end"] = total
+        for phase in self.phases:
+            phase["duration"] = round(phase["end"] - phase["start"], 3)
+            phase["start"], phase["end"] = round(phase["start"], 3), round(phase["end"], 3)
+        processes = sorted(self.processes.values(), key=lambda p: p["cpu_ticks"], reverse=True)
+        
+        profile = {
+            # Sorts by time; the suffix keeps builds finishing in the same second apart
+            "id": f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+            "success": success,
+            "bundler": self.bundler,
+            "totalSeconds": round(total, 3),
+            "reportedSeconds": self.reported,
+            "phases": self.phases,
+            "slowestPhase": max(self.phases, key=lambda p: p["duration"])["name"] if self.phases else None,
+            "chunks": self.chunks,
+            "resources": {
+                "peakRss": max((rss for _, rss, _ in self.samples), default=None),
+                "peakCpuPercent": max((cpu for _, _, cpu in self.samples), default=None),
+                "cpuSeconds": round(sum(p["cpu_ticks"] for p in processes) / CLOCK_TICKS, 2),
+                "processes": [{"pid": p["pid"], "name": p["name"],
+                               "cpuSeconds": round(p["cpu_ticks"] / CLOCK_TICKS, 2), "peakRss": p["peak_rss"]}
+                              for p in processes[:10]]
+            }
+        }
+        try:
+            await asyncio.to_thread(self._save, profile)
+            profile["traceFile"] = str(self.dir / f"{profile['id']}.trace.json")
+        except OSError as e:
+            logger.warning(f"Could not save build profile: {e}")
+        return profile
+
+    def _trace(self, profile: Dict) -> List[Dict]:
+        """Chrome trace events: phases as complete events, chunks as instants, resources as counters"""
+        pid = self.pid or 0
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"build ({self.bundler or 'npm'})"}},
+                  {"name": "build", "ph": "X", "pid": pid, "tid": 1, "ts": 0,
+                   "dur": int(profile["totalSeconds"] * 1e6)}]
+        for phase in profile["phases"]:
+            events.append({"name": phase["name"], "cat": "phase", "ph": "X", "pid": pid, "tid": 1,
+                           "ts": int(phase["start"] * 1e6), "dur": int(phase["duration"] * 1e6)})
+        for chunk in profile["chunks"]:
+            events.append({"name": chunk["file"], "cat": "chunk", "ph": "i", "s": "t", "pid": pid, "tid": 1,
+                           "ts": int(chunk["t"] * 1e6), "args": {"size": chunk["size"]}})
+        for t, rss, cpu in self.samples:
+            events.append({"name": "resources", "ph": "C", "pid": pid, "ts": int(t * 1e6),
+                           "args": {"rssMB": round(rss / 1e6, 1), "cpuPercent": cpu}})
+        return events
+
+    def _save(self, profile: Dict):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dir / f"{profile['id']}.json", 'w', encoding='utf-8') as f:
+            json.dump(profile, f)
+        with open(self.dir / f"{profile['id']}.trace.json", 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": self._trace(profile), "displayTimeUnit": "ms"}, f)
+        # Keep only the newest Config.build_profiles
+        for old in sorted(self.dir.glob("*.trace.json"))[:-config.build_profiles]:
+            old.unlink(missing_ok=True)
+            old.with_name(old.name.replace(".trace.json", ".json")).unlink(missing_ok=True)
+
+    @staticmethod
+    def list(project_dir: Path) -> List[Dict]:
+        profiles = []
+        for path in sorted((project_dir / ".devtool" / "build-profiles").glob("*.json"), reverse=True):
+            if path.name.endswith(".trace.json"):
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    profile = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profiles.append({key: profile.get(key) for key in
+                             ("id", "success", "bundler", "totalSeconds", "slowestPhase")})
+        return profiles
+
+def single_command(script: str) -> bool:
+    """Whether npm would append extra arguments to the script's only command"""
+    return not re.search(r'&&|\|\||[;|]', script)
+
+def relative_path(path: str, root: Path) -> str:
+    return os.path.relpath(path, root) if os.path.isabs(path) else path
+
+class TestReport:
+    """Structured results of a Jest or Vitest run.
+
+    Output lines are parsed as they stream (file PASS/FAIL lines, per-test
+    lines when the reporter is verbose, the summary), which gives live counts
+    for any runner. When the runner is known its JSON reporter is also
+    requested, and that file, if produced, replaces the text-parsed results.
+    """
+
+    ANSI_RE = ManagedProcess.ANSI_RE
+    JEST_FILE_RE = re.compile(r'^(PASS|FAIL)\s+(\S+)(?:\s+\((\d+(?:\.\d+)?) ?(m?s)\))?')
+    VITEST_FILE_RE = re.compile(r'^[✓❯×]\s+(\S+)\s+\((\d+) tests?([^)]*)\)(?:\s+(\d+(?:\.\d+)?) ?(m?s))?')
+    TEST_RE = re.compile(r'^([✓✔√×✕✗])\s+(.+?)(?:\s+\(?(\d+(?:\.\d+)?) ?(ms|s)\)?)?$')
+    SUMMARY_RE = re.compile(r'^Tests:?\s+(.*\d.*)$')
+    DURATION_RE = re.compile(r'^(?:Duration|Time:)\s+(\d+(?:\.\d+)?) ?(ms|s)\b')
+    FAILURE_RE = re.compile(r'^(?:FAIL\s+(\S+)\s+>\s+(.+)|●\s+(.+))$')
+    MAX_FAILURES = 50
+
+    def __init__(self, runner: Optional[str] = None, report_path: Optional[Path] = None,
+                 root: Optional[Path] = None):
+        self.runner = runner
+        self.report_path = report_path
+        self.root = root or Path.cwd()
+        self.files: Dict[str, Dict] = {}
+        self.tests: List[Dict] = []
+        self.failures: List[Dict] = []
+        self.summary: Dict = {}
+        self.current: Optional[str] = None
+        self.counted = set()  # files whose counts came from a Vitest file line
+
+    @staticmethod
+    def detect_runner(script: str) -> Optional[str]:
+        if "vitest" in script:
+            return "vitest"
+        if "jest" in script or "react-scripts test" in script:
+            return "jest"
+        return None
+
+    def reporter_args(self) -> str:
+        """Runner arguments that also write the JSON report"""
+        path = shlex.quote(str(self.report_path))
+        if self.runner == "vitest":
+            return f"--reporter=default --reporter=json --outputFile={path}"
+        if self.runner == "jest":
+            return f"--json --outputFile={path}"
+        return ""
+
+    @staticmethod
+    def _seconds(value: Optional[str], unit: Optional[str]) -> Optional[float]:
+        if value is None:
+            return None
+        return float(value) / 1000 if unit == "ms" else float(value)
+
+    def _file(self, name: str) -> Dict:
+        return self.files.setdefault(name, {"file": name, "passed": 0, "failed": 0, "skipped": 0, "duration": None})
+
+    def on_output(self, stream: str, line: str):
+        line = self.ANSI_RE.sub('', line).strip()
+        if not line:
+            return
+        match = self.JEST_FILE_RE.match(line)
+        if match:
+            self.current = match.group(2)
+            entry = self._file(self.current)
+            entry["duration"] = self._seconds(match.group(3), match.group(4))
+            entry["status"] = "failed" if match.group(1) == "FAIL" else "passed"
+            return
+        match = self.VITEST_FILE_RE.match(line)
+        if match:
+            self.current = match.group(1)
+            entry = self._file(self.current)
+            failed = re.search(r'(\d+) failed', match.group(3))
+            skipped = re.search(r'(\d+) skipped', match.group(3))
+            entry["failed"] = int(failed.group(1)) if failed else 0
+            entry["skipped"] = int(skipped.group(1)) if skipped else 0
+            entry["passed"] = int(match.group(2)) - entry["failed"] - entry["skipped"]
+            entry["duration"] = self._seconds(match.group(4), match.group(5))
+            entry["status"] = "failed" if entry["failed"] else "passed"
+            self.counted.add(self.current)
+            return
+        match = self.SUMMARY_RE.match(line)
+        if match:
+            counts = {label: int(n) for n, label in re.findall(r'(\d+) (passed|failed|skipped|todo|total)', match.group(1))}
+            total = re.search(r'\((\d+)\)', match.group(1))
+            self.summary.update({
+                "tests": counts.get("total", int(total.group(1)) if total else sum(counts.values())),
+                "passed": counts.get("passed", 0),
+                "failed": counts.get("failed", 0),
+                "skipped": counts.get("skipped", 0) + counts.get("todo", 0)
+            })
+            return
+        match = self.DURATION_RE.match(line)
+        if match:
+            self.summary["duration"] = self._seconds(match.group(1), match.group(2))
+            return
+        match = self.FAILURE_RE.match(line)
+        if match:
+            name = match.group(2) or match.group(3)
+            # The failure details repeat tests already seen failing, with their full name
+            if len(self.failures) < self.MAX_FAILURES and \
+                    not any(f["test"] and name.endswith(f["test"]) for f in self.failures):
+                self.failures.append({"file": match.group(1) or self.current, "test": name, "message": None})
+            return
+        match = self.TEST_RE.match(line)
+        if match and self.current:
+            passed = match.group(1) in "✓✔√"
+            self.tests.append({"file": self.current, "test": match.group(2), "passed": passed,
+                               "duration": self._seconds(match.group(3), match.group(4))})
+            if not passed and len(self.failures) < self.MAX_FAILURES:
+                self.failures.append({"file": self.current, "test": match.group(2), "message": None})
+            # Jest only lists tests in verbose mode and has no per-file counts otherwise
+            if self.current not in self.counted:
+                self._file(self.current)["passed" if passed else "failed"] += 1
+
+    def _from_json(self, data: Dict):
+        self.files, self.tests, self.failures = {}, [], []
+        ends = []
+        for suite in data.get("testResults", []):
+            name = relative_path(suite.get("name") or suite.get("testFilePath", ""), self.root)
+            entry = self._file(name)
+            if suite.get("startTime") and suite.get("endTime"):
+                entry["duration"] = round((suite["endTime"] - suite["startTime"]) / 1000, 3)
+                ends.append(suite["endTime"])
+            for test in suite.get("assertionResults", []):
+                status = test.get("status")
+                key = "passed" if status == "passed" else "failed" if status == "failed" else "skipped"
+                entry[key] += 1
+                title = test.get("fullName") or test.get("title")
+                if test.get("duration") is not None:
+                    self.tests.append({"file": name, "test": title, "passed": status == "passed",
+                                       "duration": round(test["duration"] / 1000, 4)})
+                if status == "failed" and len(self.failures) < self.MAX_FAILURES:
+                    messages = test.get("failureMessages") or [""]
+                    self.failures.append({"file": name, "test": title,
+                                          "message": self.ANSI_RE.sub('', messages[0])[:500]})
+            entry["status"] = "failed" if entry["failed"] or suite.get("status") == "failed" else "passed"
+            if suite.get("status") == "failed" and not suite.get("assertionResults") \
+                    and len(self.failures) < self.MAX_FAILURES:
+                # The file itself failed to load or compile
+                self.failures.append({"file": name, "test": None,
+                                      "message": self.ANSI_RE.sub('', suite.get("message") or "")[:500]})
+        self.summary = {
+            "tests": data.get("numTotalTests", 0),
+            "passed": data.get("numPassedTests", 0),
+            "failed": data.get("numFailedTests", 0),
+            "skipped": data.get("numPendingTests", 0) + data.get("numTodoTests", 0),
+            "duration": round((max(ends) - data["startTime"]) / 1000, 3) if ends and data.get("startTime") else None
+        }
+
+    def finish(self) -> Dict:
+        """The compact report; reads (and removes) the JSON reporter file when there is one"""
+        source = "text"
+        if self.report_path:
+            try:
+                with open(self.report_path, 'r') as f:
+                    self._from_json(json.load(f))
+                source = "json"
+            except (OSError, ValueError):
+                pass
+            finally:
+                try:
+                    self.report_path.unlink()
+                except OSError:
+                    pass
+
+        files = sorted(self.files.values(), key=lambda f: f["file"])
+        summary = {"tests": sum(f["passed"] + f["failed"] + f["skipped"] for f in files),
+                   "passed": sum(f["passed"] for f in files), "failed": sum(f["failed"] for f in files),
+                   "skipped": sum(f["skipped"] for f in files), "duration": None}
+        summary.update({key: value for key, value in self.summary.items() if value is not None})
+        summary["files"] = len(files)
+        summary["failedFiles"] = sum(1 for f in files if f.get("status") == "failed")
+        timed = [test for test in self.tests if test["duration"] is not None]
+        return {
+            "runner": self.runner,
+            "source": source,
+            "summary": summary,
+            "files": files,
+            "failures": self.failures,
+            "slowest": heapq.nlargest(config.slowest_tests, timed, key=lambda t: t["duration"]),
+            "timings": timed  # every timed test, for the history; dropped before returning to clients
+        }
+
+class LintReport:
+    """Structured ESLint results: the JSON formatter's output, or stylish text parsed as it streams"""
+
+    ANSI_RE = ManagedProcess.ANSI_RE
+    PROBLEM_RE = re.compile(r'^(\d+):(\d+)\s+(error|warning)\s+(.*?)(?:\s{2,}(\S+))?$')
+    MAX_DIAGNOSTICS = 200
+
+    def __init__(self, report_path: Optional[Path] = None, root: Optional[Path] = None):
+        self.report_path = report_path
+        self.root = root or Path.cwd()
+        self.entries: List[Dict] = []
+        self.current: Optional[Dict] = None
+
+    @staticmethod
+    def supports_json(script: str) -> bool:
+        return ("eslint" in script or "next lint" in script) and single_command(script)
+
+    def reporter_args(self) -> str:
+        return f"--format json --output-file {shlex.quote(str(self.report_path))}"
+
+    def on_output(self, stream: str, line: str):
+        line = self.ANSI_RE.sub('', line).rstrip()
+        if line.startswith("/") or re.match(r'^[A-Za-z]:\\', line):
+            self.current = {"filePath": line, "messages": []}
+            self.entries.append(self.current)
+            return
+        match = self.PROBLEM_RE.match(line.strip())
+        if match and self.current is not None:
+            self.current["messages"].append({
+                "line": int(match.group(1)), "column": int(match.group(2)),
+                "severity": 2 if match.group(3) == "error" else 1,
+                "message": match.group(4), "ruleId": match.group(5)
+            })
+
+    @classmethod
+    def compact(cls, entries: List[Dict], root: Path) -> Dict:
+        """Per-file counts and capped diagnostics from ESLint's JSON results"""
+        files, diagnostics = [], []
+        errors = warnings = fixable = 0
+        for entry in entries:
+            messages = entry.get("messages", [])
+            file_errors = entry.get("errorCount", sum(1 for m in messages if m.get("severity") == 2))
+            file_warnings = entry.get("warningCount", sum(1 for m in messages if m.get("severity") != 2))
+            errors += file_errors
+            warnings += file_warnings
+            fixable += entry.get("fixableErrorCount", 0) + entry.get("fixableWarningCount", 0)
+            rel = relative_path(entry.get("filePath", ""), root)
+            if file_errors or file_warnings:
+                files.append({"file": rel, "errors": file_errors, "warnings": file_warnings})
+            for message in messages:
+                if len(diagnostics) < cls.MAX_DIAGNOSTICS:
+                    diagnostics.append({"file": rel, "line": message.get("line"), "column": message.get("column"),
+                                        "rule": message.get("ruleId"),
+                                        "severity": "error" if message.get("severity") == 2 else "warning",
+                                        "message": message.get("message")})
+        return {
+            "summary": {"files": len(entries), "filesWithProblems": len(files), "errors": errors,
+                        "warnings": warnings, "fixable": fixable},
+            "files": files,
+            "diagnostics": diagnostics
+        }
+
+    def finish(self) -> Dict:
+        source = "text"
+        entries = self.entries
+        if self.report_path:
+            try:
+                with open(self.report_path, 'r') as f:
+                    entries = json.load(f)
+                source = "json"
+            except (OSError, ValueError):
+                pass
+            finally:
+                try:
+                    self.report_path.unlink()
+                except OSError:
+                    pass
+        return {"source": source, **self.compact(entries, self.root)}
+
+class TestHistory:
+    """JSONL history of test runs under <project>/.devtool, for runtime regressions.
+
+    Each run stores its totals and the durations of its slowest tests; a test
+    counts as regressed when it takes clearly longer than its median over the
+    previous runs that timed it.
+    """
+
+    KEPT_PER_RUN = 50  # slowest tests stored per run (more than reported, so tests can be matched)
+    REGRESSION_RATIO = 1.5
+    REGRESSION_MIN_SECONDS = 0.1
+
+    def __init__(self, project_dir: Path):
+        self.path = project_dir / ".devtool" / "test-history.jsonl"
+        self.records: Optional[List[Dict]] = None
+        # Runs record from worker threads while the history route reads
+        self.lock = threading.Lock()
+
+    def _load(self) -> List[Dict]:
+        if self.records is None:
+            self.records = []
+            if self.path.exists():
+                with open(self.path, 'r') as f:
+                    for line in f:
+                        try:
+                            self.records.append(json.loads(line))
+                        except ValueError:
+                            continue
+        return self.records
+
+    def regressions(self, timings: List[Dict]) -> List[Dict]:
+        history: Dict[str, List[float]] = {}
+        with self.lock:
+            for record in self._load():
+                for test_id, duration in record["slowest"].items():
+                    history.setdefault(test_id, []).append(duration)
+        found = []
+        for test in timings:
+            previous = history.get(f"{test['file']} :: {test['test']}")
+            if not previous:
+                continue
+            baseline = sorted(previous)[len(previous) // 2]
+            if test["duration"] > baseline * self.REGRESSION_RATIO and \
+                    test["duration"] - baseline > self.REGRESSION_MIN_SECONDS:
+                found.append({"file": test["file"], "test": test["test"], "duration": test["duration"],
+                              "baseline": baseline, "ratio": round(test["duration"] / baseline, 2)})
+        return sorted(found, key=lambda r: r["ratio"], reverse=True)[:config.slowest_tests]
+
+    def record(self, report: Dict) -> Dict:
+        slowest = heapq.nlargest(self.KEPT_PER_RUN, report["timings"], key=lambda t: t["duration"])
+        with self.lock:
+            records = self._load()
+            entry = {
+                "id": records[-1]["id"] + 1 if records else 1,
+                "timestamp": datetime.now().isoformat(),
+                "summary": report["summary"],
+                "slowest": {f"{t['file']} :: {t['test']}": t["duration"] for t in slowest}
+            }
+            records.append(entry)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if len(records) > 2 * config.test_history_limit:
+                del records[:-config.test_history_limit]
+                with open(self.path, 'w') as f:
+                    f.writelines(json.dumps(r, separators=(',', ':')) + "\n" for r in records)
+            else:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        return entry
+
+    def slowest(self, limit: int) -> Dict:
+        """The currently slowest tests with their duration in each recorded run"""
+        with self.lock:
+            records = list(self._load())
+        if not records:
+            return {"runs": 0, "tests": []}
+        latest = records[-1]["slowest"]
+        tests = []
+        for test_id, duration in sorted(latest.items(), key=lambda item: item[1], reverse=True)[:limit]:
+            trend = [r["slowest"].get(test_id) for r in records[-20:]]
+            tests.append({"test": test_id, "duration": duration, "trend": trend})
+        return {
+            "runs": len(records),
+            "lastRun": records[-1]["timestamp"],
+            "summaries": [{"id": r["id"], "timestamp": r["timestamp"], **r["summary"]} for r in records[-20:]],
+            "tests": tests
+        }
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    params: Dict
+    status: str = "queued"  # queued, running, succeeded, failed
+    progress: float = 0.0
+    returncode: Optional[int] = None
+    created: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    output: deque = None
+    output_seq: int = 0
+    result: Optional[Dict] = None
+    task: Optional[asyncio.Task] = None
+    changed: Optional[asyncio.Event] = None
+
+    PROGRESS_RE = re.compile(r'(\d{1,3})%')
+
+    def __post_init__(self):
+        if self.output is None:
+            self.output = deque(maxlen=config.max_job_output_lines)
+        self.changed = asyncio.Event()
+
+    def append_output(self, stream: str, line: str):
+        """Record one line of command output as it is produced"""
+        self.output.append(line)
+        self.output_seq += 1
+        match = self.PROGRESS_RE.search(line)
+        if match and int(match.group(1)) <= 100:
+            self.progress = max(self.progress, int(match.group(1)) / 100)
+        self._notify()
+
+    def _notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def output_since(self, cursor: int) -> List[str]:
+        """Output lines after cursor that are still in the buffer"""
+        count = min(self.output_seq - cursor, len(self.output))
+        return list(self.output)[len(self.output) - count:] if count > 0 else []
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self, include_output: bool = True) -> Dict:
+        end = self.finished or time.time()
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "returncode": self.returncode,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "elapsed": round(end - self.started, 3) if self.started else 0.0,
+            "cursor": self.output_seq
+        }
+        if include_output:
+            data["output"] = list(self.output)
+            if self.result and not self.result.get("success"):
+                data["error"] = self.result.get("error") or self.result.get("stderr")
+        return data
+
+def available_cpus() -> int:
+    """CPUs this process may actually run on (respects taskset/cgroup affinity)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+class CommandScheduler:
+    """Global cap on commands running at once, shared fairly between projects.
+
+    Waiting commands queue per project and free slots are handed out
+    round-robin across projects, so a project with a backlog of builds can't
+    keep another project's commands waiting behind all of them.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or config.max_parallel_commands or max(1, available_cpus() // 2)
+        self.running: Dict[str, int] = {}
+        self.waiting: Dict[str, deque] = {}
+        self.turns: deque = deque()  # projects with waiters, in serving order
+
+    @property
+    def busy(self) -> bool:
+        return sum(self.running.values()) >= self.capacity or bool(self.turns)
+
+    async def acquire(self, project_id: str):
+        if not self.busy:
+            self.running[project_id] = self.running.get(project_id, 0) + 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        if project_id not in self.waiting:
+            self.waiting[project_id] = deque()
+            self.turns.append(project_id)
+        self.waiting[project_id].append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(project_id)  # granted just as we were cancelled
+            raise
+
+    def release(self, project_id: str):
+        self.running[project_id] -= 1
+        if not self.running[project_id]:
+            del self.running[project_id]
+        while self.turns and sum(self.running.values()) < self.capacity:
+            turn = self.turns.popleft()
+            queue = self.waiting[turn]
+            waiter = queue.popleft()
+            if queue:
+                self.turns.append(turn)
+            else:
+                del self.waiting[turn]
+            if not waiter.done():
+                self.running[turn] = self.running.get(turn, 0) + 1
+                waiter.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, project_id: str):
+        await self.acquire(project_id)
+        try:
+            yield
+        finally:
+            self.release(project_id)
+
+    def stats(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "running": dict(self.running),
+            "waiting": {project: len(queue) for project, queue in self.waiting.items()}
+        }
+
+class JobManager:
+    """Runs long operations in the background on a bounded scheduler"""
+
+    def __init__(self, api: "DevToolAPI"):
+        self.api = api
+        self.jobs: Dict[str, Job] = {}
+        self.slots = asyncio.Semaphore(config.max_concurrent_jobs)
+        self.kind_slots = {kind: asyncio.Semaphore(limit) for kind, limit in config.job_limits.items()}
+        self.runners = {
+            "install": lambda job: api.install_dependencies(on_output=job.append_output,
+                                                            force=job.params.get("force") in ("1", "true")),
+            "build": lambda job: api.build_project(on_output=job.append_output,
+                                                   force=job.params.get("force") in ("1", "true"),
+                                                   profile=job.params.get("profile") in ("1", "true")),
+            "test": lambda job: api.run_tests(on_output=job.append_output),
+            "lint": lambda job: api.run_linter(on_output=job.append_output),
+            "check": lambda job: api.run_checks(changed_only=job.params.get("changed") in ("1", "true"),
+                                                base=job.params.get("base", "HEAD"),
+                                                lint=job.params.get("only") in (None, "lint"),
+                                                test=job.params.get("only") in (None, "test"),
+                                                on_output=job.append_output),
+            "deploy": lambda job: api.deploy_project(job.params.get("platform", ""),
+                                                     on_output=job.append_output),
+        }
+
+    async def submit(self, kind: str, params: Optional[Dict] = None) -> Dict:
+        """Queue a job, or return the active job of the same kind and params"""
+        if kind not in self.runners:
+            return {"error": f"Unknown job kind: {kind}"}
+        params = params or {}
+        
+        for job in self.jobs.values():
+            if job.kind == kind and job.params == params and job.active:
+                return {**job.to_dict(include_output=False), "reused": True}
+        
+        job = Job(id=uuid.uuid4().hex[:12], kind=kind, params=params, created=time.time())
+        self.jobs[job.id] = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        self._prune()
+        self.api.log(f"📋 Queued {kind} job {job.id}")
+        return {**job.to_dict(include_output=False), "reused": False}
+
+    async def _run(self, job: Job):
+        async with self.slots, self.kind_slots.setdefault(job.kind, asyncio.Semaphore(1)):
+            job.status = "running"
+            job.started = time.time()
+            try:
+                result = await self.runners[job.kind](job)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            
+            job.result = result
+            job.returncode = result.get("returncode")
+            job.status = "succeeded" if result.get("success") else "failed"
+            job.progress = 1.0
+            job.finished = time.time()
+            job.task = None
+            job._notify()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job for job in self.jobs.values() if not job.active]
+        for job in finished[:max(0, len(finished) - config.max_finished_jobs)]:
+            del self.jobs[job.id]
+
+    async def get(self, job_id: str) -> Dict:
+        job = self.jobs.get(job_id)
+        if not job:
+            return {"error": "Job not found"}
+        return job.to_dict()
+
+    async def list(self) -> List[Dict]:
+        return [job.to_dict(include_output=False) for job in self.jobs.values()]
+
+    async def read_output(self, job_id: str, cursor: int = 0, timeout: float = 15.0) -> Dict:
+        """Wait up to timeout for output after cursor, for streaming clients"""
+        job = self.jobs.get(job_id)
+        if not job:
+            return {"error": "Job not found"}
+        if job.output_seq <= cursor and job.active:
+            try:
+                await asyncio.wait_for(job.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return {
+            "lines": job.output_since(cursor),
+            "cursor": job.output_seq,
+            "done": not job.active,
+            "job": job.to_dict(include_output=False)
+        }
+
+class FileWatcher:
+    """Reports debounced batches of changed project files.
+
+    Uses inotify (through libc, no extra dependency) where available and
+    falls back to polling file mtimes directory by directory with scandir.
+    Ignored directories from the ProjectIndex are never watched.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, index: ProjectIndex, on_changes: Callable[[set], "asyncio.Future"],
+                 debounce: float, poll_interval: float):
+        self.index = index
+        self.on_changes = on_changes
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend: Optional[str] = None
+        self.pending: set = set()
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.fd: Optional[int] = None
+        self.watches: Dict[int, str] = {}
+        self.poll_task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        await asyncio.to_thread(self.index.refresh)
+        if self._start_inotify():
+            self.backend = "inotify"
+        else:
+            self.backend = "polling"
+            self.poll_task = self.loop.create_task(self._poll())
+
+    def stop(self):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = None
+        if self.poll_task:
+            self.poll_task.cancel()
+            self.poll_task = None
+
+    def _changed(self, rel: str):
+        """Record a change and (re)arm the debounce timer"""
+        self.pending.add(rel)
+        if self.flush_handle:
+            self.flush_handle.cancel()
+        self.flush_handle = self.loop.call_later(self.debounce, self._flush)
+
+    def _flush(self):
+        changes, self.pending = self.pending, set()
+        self.flush_handle = None
+        if changes:
+            self.loop.create_task(self.on_changes(changes))
+
+    # inotify backend
 
-config = Config()
+    def _start_inotify(self) -> bool:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            self._add_watch = libc.inotify_add_watch
+            self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return False
+        if fd < 0:
+            return False
+        self.fd = fd
+        for rel in list(self.index.dirs):
+            self._watch_dir(rel)
+        self.loop.add_reader(fd, self._read_events)
+        return True
 
-# Logging setup
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+    def _watch_dir(self, rel: str):
+        path = os.path.join(self.index.root, rel) if rel else str(self.index.root)
+        wd = self._add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = rel
+
+    def _watch_tree(self, rel: str):
+        """Watch a new directory and everything under it (mkdir -p, a tree moved in).
+
+        The watch goes on before the scan so nothing created meanwhile is
+        missed; files already there are reported as changed.
+        """
+        self._watch_dir(rel)
+        try:
+            with os.scandir(os.path.join(self.index.root, rel)) as entries:
+                for entry in entries:
+                    child = f"{rel}/{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in self.index.ignored:
+                            self._watch_tree(child)
+                    elif entry.is_file(follow_symlinks=False):
+                        self._changed(child)
+        except OSError:
+            pass  # removed again before we got to it
+
+    def _read_events(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode('utf-8', 'replace')
+            offset += length
+            
+            if mask & self.IN_Q_OVERFLOW:
+                self._changed("*")  # events were lost; treat as "everything changed"
+                continue
+            if mask & self.IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            rel_dir = self.watches.get(wd)
+            if rel_dir is None or not name:
+                continue
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            if mask & self.IN_ISDIR:
+                if name in self.index.ignored:
+                    continue
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self._watch_tree(rel)
+            self._changed(rel)
+
+    # polling backend
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        root = str(self.index.root)
+        snapshot = {}
+        for rel in list(self.index.refresh().dirs):
+            try:
+                with os.scandir(f"{root}/{rel}" if rel else root) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False):
+                            st = entry.stat()
+                            snapshot[f"{rel}/{entry.name}" if rel else entry.name] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    async def _poll(self):
+        previous = await asyncio.to_thread(self._snapshot)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(self._snapshot)
+            for rel in set(previous) | set(current):
+                if previous.get(rel) != current.get(rel):
+                    self._changed(rel)
+            previous = current
+
+def local_bin(project_dir: Path, name: str) -> Optional[str]:
+    """Project-local binary; npx would add startup time and may hit the network"""
+    path = project_dir / "node_modules" / ".bin" / name
+    return shlex.quote(str(path)) if path.exists() else None
+
+def related_tests_command(project_dir: Path, files: List[str]) -> Optional[str]:
+    """Runner command that only runs tests related to the changed files"""
+    quoted = " ".join(shlex.quote(f) for f in files)
+    vitest = local_bin(project_dir, "vitest")
+    if vitest:
+        return f"{vitest} related --run --passWithNoTests {quoted}"
+    jest = local_bin(project_dir, "jest")
+    if jest:
+        return f"{jest} --findRelatedTests --passWithNoTests {quoted}"
+    return None
+
+class WatchPipeline:
+    """Live-reload pipeline: debounced changes -> rebuild / lint / test on the affected files.
+
+    Runs never overlap; changes arriving during a run are merged into at
+    most one follow-up run. Results and reload notifications go to an event
+    buffer that browsers follow over Server-Sent Events.
+    """
+
+    LINTABLE = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".vue", ".svelte"}
+    ACTIONS = ("build", "lint", "test")
+
+    def __init__(self, api: "DevToolAPI"):
+        self.api = api
+        self.events = LogBuffer(200)
+        self.watcher: Optional[FileWatcher] = None
+        self.actions: List[str] = ["build"]
+        self.running = False
+        self.queued: Optional[set] = None
+        self.runs = 0
+
+    @property
+    def active(self) -> bool:
+        return self.watcher is not None
+
+    def emit(self, event: str, **data):
+        self.events.append({"timestamp": datetime.now().isoformat(), "level": event, **data})
+
+    async def start(self, actions: Optional[List[str]] = None, debounce: Optional[float] = None) -> Dict:
+        if self.watcher:
+            return {"error": "Watch mode already running"}
+        actions = actions or ["build"]
+        unknown = [action for action in actions if action not in self.ACTIONS]
+        if unknown:
+            return {"error": f"Unknown watch actions: {', '.join(unknown)}"}
+        self.actions = actions
+        self.watcher = FileWatcher(self.api.index, self.on_changes,
+                                   config.watch_debounce if debounce is None else debounce,
+                                   config.watch_poll_interval)
+        await self.watcher.start()
+        self.api.log(f"👀 Watch mode started ({self.watcher.backend}): {', '.join(actions)}")
+        return {"success": True, **self.status()}
+
+    async def stop(self) -> Dict:
+        if not self.watcher:
+            return {"error": "Watch mode not running"}
+        self.watcher.stop()
+        self.watcher = None
+        self.api.log("👀 Watch mode stopped")
+        return {"success": True}
+
+    def status(self) -> Dict:
+        return {
+            "active": self.active,
+            "backend": self.watcher.backend if self.watcher else None,
+            "actions": self.actions,
+            "running": self.running,
+            "queued": self.queued is not None,
+            "runs": self.runs,
+            "cursor": self.events.next_seq
+        }
+
+    async def on_changes(self, changes: set):
+        if self.running:
+            # Coalesce into the single follow-up run
+            self.queued = (self.queued or set()) | changes
+            return
+        self.running = True
+        try:
+            while changes:
+                await self._run(changes)
+                changes, self.queued = self.queued, None
+        finally:
+            self.running = False
+
+    async def _run(self, changes: set):
+        self.runs += 1
+        files = sorted(changes)
+        self.emit("change", files=files[:100], count=len(files))
+        existing = [rel for rel in files if rel != "*" and (self.api.project_dir / rel).is_file()]
+        lintable = [rel for rel in existing if os.path.splitext(rel)[1] in self.LINTABLE]
+        
+        if "build" in self.actions:
+            result = await self.api.build_project()
+            self.emit("build", success=bool(result.get("success")), cached=result.get("cached"),
+                      error=result.get("error") or (None if result.get("success") else result.get("stderr")))
+            if result.get("success"):
+                self.emit("reload", files=files[:100])
+        if "lint" in self.actions and lintable:
+            eslint = local_bin(self.api.project_dir, "eslint")
+            if eslint:
+                result = await self.api.execute_command(
+                    f"{eslint} --no-error-on-unmatched-pattern " + " ".join(shlex.quote(f) for f in lintable),
+                    kind="lint")
+                self.emit("lint", success=result.get("success"), files=lintable, output=result.get("stdout"))
+        if "test" in self.actions and existing:
+            command = related_tests_command(self.api.project_dir, existing)
+            if command:
+                result = await self.api.run_test_command(command)
+                self.emit("test", success=result.get("success"), files=existing, output=result.get("stdout"),
+                          summary=(result.get("report") or {}).get("summary"),
+                          failures=(result.get("report") or {}).get("failures"))
+
+class QualityChecks:
+    """Lint and tests run together, optionally only for what changed.
+
+    Lint runs with the project's local ESLint in parallel batches and tests
+    with the project's test script (or only the tests related to the changed
+    files); everything goes through the CommandScheduler, which caps how many
+    run at once by CPU count. Files that linted clean are remembered by
+    content hash, and a passing test run by the hash of all inputs, so an
+    unchanged file is never re-linted and unchanged inputs are never re-tested.
+    """
+
+    CONFIG_FILES = ("package.json", "tsconfig.json", ".eslintignore", ".eslintrc", ".eslintrc.js",
+                    ".eslintrc.cjs", ".eslintrc.json", ".eslintrc.yml", ".eslintrc.yaml",
+                    "eslint.config.js", "eslint.config.mjs", "eslint.config.cjs", "eslint.config.ts")
+    MAX_CLEAN = 50000  # clean-file entries kept
+
+    def __init__(self, api: "DevToolAPI"):
+        self.api = api
+        self.state_path = api.project_dir / ".devtool" / "check-cache.json"
+        self.state: Optional[Dict] = None
+
+    def _load(self) -> Dict:
+        if self.state is None:
+            try:
+                with open(self.state_path, 'r') as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {}
+            for key in ("files", "seen", "clean", "tests"):
+                self.state.setdefault(key, {})
+        return self.state
+
+    def _save(self):
+        state = self._load()
+        if len(state["clean"]) > self.MAX_CLEAN:
+            newest = sorted(state["clean"].items(), key=lambda item: item[1])[-self.MAX_CLEAN:]
+            state["clean"] = dict(newest)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        with open(tmp, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp, self.state_path)
+
+    def _hash_files(self) -> Dict[str, str]:
+        """Content hash of every indexed file, re-hashing only files whose stat changed"""
+        state = self._load()
+        known = state["files"]
+        files, hashes = {}, {}
+        root = str(self.api.project_dir)
+        for rel in sorted(self.api.index.refresh().files()):
+            try:
+                st = os.stat(f"{root}/{rel}")
+            except OSError:
+                continue
+            cached = known.get(rel)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                file_hash = cached[2]
+            else:
+                try:
+                    file_hash = BuildCache.hash_file(f"{root}/{rel}")
+                except OSError:
+                    continue
+            files[rel] = [st.st_size, st.st_mtime_ns, file_hash]
+            hashes[rel] = file_hash
+        state["files"] = files
+        return hashes
+
+    def _git_changed(self, base: str) -> Optional[List[str]]:
+        """Files changed against base plus untracked ones; None outside a git work tree, ValueError for a bad ref"""
+        if not base or base.startswith("-"):
+            # Would be parsed as an option (e.g. --output=<file>)
+            raise ValueError(f"Invalid base ref: {base}")
+        cwd = str(self.api.project_dir)
+        try:
+            verify = subprocess.run(["git", "rev-parse", "--verify", "--quiet", "--end-of-options",
+                                     f"{base}^{{commit}}"], cwd=cwd, capture_output=True, text=True, timeout=30)
+            if verify.returncode != 0:
+                inside = subprocess.run(["git", "rev-parse", "--is-inside-work-tree"], cwd=cwd,
+                                        capture_output=True, text=True, timeout=30)
+                if inside.returncode != 0:
+                    return None
+                raise ValueError(f"Unknown base ref: {base}")
+            diff = subprocess.run(["git", "diff", "--name-only", "--relative", "--end-of-options", base], cwd=cwd,
+                                  capture_output=True, text=True, timeout=30)
+            untracked = subprocess.run(["git", "ls-files", "--others", "--exclude-standard"], cwd=cwd,
+                                       capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if diff.returncode != 0 or untracked.returncode != 0:
+            return None
+        return sorted(set(diff.stdout.split("\n") + untracked.stdout.split("\n")) - {""})
+
+    def _plan(self, changed_only: bool, base: str) -> Dict:
+        hashes = self._hash_files()
+        state = self._load()
+        changed, source = None, None
+        if changed_only:
+            changed = self._git_changed(base)
+            source = "git"
+            if changed is None:
+                # No git: changed since the last check run, by content hash
+                changed = [rel for rel, file_hash in hashes.items() if state["seen"].get(rel) != file_hash]
+                source = "index"
+            changed = [rel for rel in changed if rel in hashes]
+        config_hash = hashlib.sha256("".join(f"{name}:{hashes.get(name)}"
+                                             for name in self.CONFIG_FILES).encode()).hexdigest()
+        if state.get("configHash") != config_hash:
+            # ESLint config or dependencies changed: nothing linted before is known clean
+            state["clean"] = {}
+            state["configHash"] = config_hash
+        inputs = hashlib.sha256("".join(f"{rel}\0{file_hash}\n"
+                                        for rel, file_hash in hashes.items()).encode()).hexdigest()
+        return {"hashes": hashes, "changed": changed, "source": source, "inputs": inputs}
+
+    async def run(self, changed_only: bool = False, base: str = "HEAD", lint: bool = True, test: bool = True,
+                  on_output: Optional[Callable[[str, str], None]] = None) -> Dict:
+        started = time.monotonic()
+        plan = await asyncio.to_thread(self._plan, changed_only, base)
+        files = plan["changed"] if changed_only else list(plan["hashes"])
+        
+        steps = {}
+        if lint:
+            steps["lint"] = self._lint(files, plan["hashes"], on_output)
+        if test:
+            steps["test"] = self._test(plan["changed"] if changed_only else None, plan["inputs"], on_output)
+        results = dict(zip(steps, await asyncio.gather(*steps.values())))
+        
+        state = self._load()
+        state["seen"] = plan["hashes"]
+        await asyncio.to_thread(self._save)
+        return {
+            "success": all(result.get("success") for result in results.values()),
+            "changedOnly": changed_only,
+            "changedSource": plan["source"],
+            "changedFiles": plan["changed"][:100] if plan["changed"] is not None else None,
+            **results,
+            "duration": round(time.monotonic() - started, 3)
+        }
+
+    async def _lint(self, files: List[str], hashes: Dict[str, str],
+                    on_output: Optional[Callable[[str, str], None]]) -> Dict:
+        eslint = local_bin(self.api.project_dir, "eslint")
+        if not eslint:
+            # No local ESLint to drive file by file: run the project's lint script as is
+            result = await self.api.run_linter(on_output=on_output)
+            return {"success": result.get("success"), "mode": "script", "returncode": result.get("returncode"),
+                    "report": result.get("report"), "output": result.get("stdout") or result.get("stderr")}
+        
+        clean = self._load()["clean"]
+        lintable = [rel for rel in files if os.path.splitext(rel)[1] in WatchPipeline.LINTABLE]
+        todo = [rel for rel in lintable if f"{rel}:{hashes[rel]}" not in clean]
+        if not todo:
+            return {"success": True, "mode": "eslint", "files": len(lintable), "cached": len(lintable),
+                    "linted": 0, "errors": 0, "warnings": 0, "diagnostics": []}
+        
+        # Batches sized so every allowed CPU gets work, each small enough for the command line
+        workers = max(1, min(self.api.scheduler.capacity, available_cpus()))
+        size = min(config.lint_batch_size, -(-len(todo) // workers))
+        batches = [todo[i:i + size] for i in range(0, len(todo), size)]
+        report_dir = self.api.project_dir / ".devtool"
+        report_dir.mkdir(exist_ok=True)
+        
+        async def lint_batch(batch: List[str]) -> Tuple[Dict, List[Dict]]:
+            report = report_dir / f"eslint-{uuid.uuid4().hex[:8]}.json"
+            command = (f"{eslint} --no-error-on-unmatched-pattern --format json "
+                       f"--output-file {shlex.quote(str(report))} " + " ".join(shlex.quote(f) for f in batch))
+            result = await self.api.execute_command(command, on_output=on_output, kind="lint")
+            try:
+                with open(report, 'r') as f:
+                    return result, json.load(f)
+            except (OSError, ValueError):
+                return result, []
+            finally:
+                report.unlink(missing_ok=True)
+        
+        outcomes = await asyncio.gather(*(lint_batch(batch) for batch in batches))
+        entries = []
+        crashed = False
+        now = time.time()
+        root = self.api.project_dir.resolve()
+        for result, report in outcomes:
+            # ESLint exits 1 for lint errors and 2 when it couldn't run
+            crashed = crashed or result.get("returncode") not in (0, 1)
+            for entry in report:
+                rel = os.path.relpath(entry.get("filePath", ""), root)
+                if not entry.get("errorCount") and not entry.get("warningCount") and rel in hashes:
+                    clean[f"{rel}:{hashes[rel]}"] = now
+            entries.extend(report)
+        report = LintReport.compact(entries, root)
+        return {
+            "success": not crashed and report["summary"]["errors"] == 0,
+            "mode": "eslint",
+            "files": len(lintable),
+            "cached": len(lintable) - len(todo),
+            "linted": len(todo),
+            "batches": len(batches),
+            "errors": report["summary"]["errors"],
+            "warnings": report["summary"]["warnings"],
+            "fixable": report["summary"]["fixable"],
+            "problemFiles": report["files"],
+            "diagnostics": report["diagnostics"]
+        }
+
+    async def _test(self, changed: Optional[List[str]], inputs: str,
+                    on_output: Optional[Callable[[str, str], None]]) -> Dict:
+        tests = self._load()["tests"]
+        if tests.get(f"all:{inputs}") or (changed is not None and tests.get(f"related:{inputs}")):
+            return {"success": True, "cached": True}
+        
+        if changed is None:
+            result = await self.api.run_tests(on_output=on_output)
+            key, mode = f"all:{inputs}", "all"
+        else:
+            if not changed:
+                return {"success": True, "cached": False, "skipped": "no changed files"}
+            command = related_tests_command(self.api.project_dir, changed)
+            if command:
+                result = await self.api.run_test_command(command, on_output=on_output)
+                key, mode = f"related:{inputs}", "related"
+            else:
+                # Runner can't select related tests: run the whole suite
+                result = await self.api.run_tests(on_output=on_output)
+                key, mode = f"all:{inputs}", "all"
+        
+        if result.get("success"):
+            tests[key] = time.time()
+            for old in sorted(tests, key=tests.get)[:-20]:
+                del tests[old]
+        return {"success": bool(result.get("success")), "cached": False, "mode": mode,
+                "returncode": result.get("returncode"), "duration": result.get("duration"),
+                "report": result.get("report"), "output": result.get("stdout") or result.get("stderr")}
 
 class DevToolAPI:
-    def __init__(self):
-        self.project_dir = Path(config.project_dir)
-        self.server_process = None
-        self.logs = []
+    PROJECT_NAME_RE = re.compile(r'^[A-Za-z0-9._-]+$')
+
+    def __init__(self, project_dir: Optional[str] = None, project_id: str = "default",
+                 scheduler: Optional[CommandScheduler] = None, store: Optional["HistoryStore"] = None):
+        self.project_dir = Path(project_dir or config.project_dir)
+        self.project_id = project_id
+        self.scheduler = scheduler or CommandScheduler()
+        self.store = store  # persistent run/log history; None keeps everything in memory only
+        self.dev_server: Optional[ManagedProcess] = None
+        self.index = ProjectIndex(self.project_dir)
+        self.manifest = PackageManifest(self.project_dir)
+        self.bundle_analyzer = BundleAnalyzer()
+        self.bundle_history = BundleHistory(self.project_dir)
+        self.build_cache = BuildCache(self.project_dir, self.index)
+        # Held from fingerprint to cache record: API, job and watch builds share dist/ and the cache
+        self.build_lock = asyncio.Lock()
+        self.logs = LogBuffer(config.max_log_lines)
+        self.jobs = JobManager(self)
+        self.watch = WatchPipeline(self)
+        self.search_index = SearchIndex(self.project_dir, self.index)
+        self.checks = QualityChecks(self)
+        self.test_history = TestHistory(self.project_dir)
+        self.write_lock = threading.Lock()
         self.frameworks = {
             'react': {
                 'name': 'React',
@@ -109,52 +3022,122 @@ class DevToolAPI:
             "message": message
         }
         self.logs.append(log_entry)
+        if self.store:
+            self.store.record_log(self.project_id, log_entry)
         
-        # Keep only last N logs
-        if len(self.logs) > config.max_log_lines:
-            self.logs = self.logs[-config.max_log_lines:]
-        
-        logger.info(f"{level.upper()}: {message}")
+        # Command output is already in the log buffer; keep the console readable
+        console_level = logging.DEBUG if level in ("stdout", "stderr") else logging.INFO
+        logger.log(console_level, f"[{self.project_id}] {level.upper()}: {message}")
 
-    async def execute_command(self, command: str, cwd: Optional[str] = None) -> Dict:
-        """Execute shell command asynchronously"""
+    async def execute_command(self, command: str, cwd: Optional[str] = None,
+                              on_output: Optional[Callable[[str, str], None]] = None,
+                              kind: str = "command",
+                              on_start: Optional[Callable[[int], None]] = None,
+                              timeout: Optional[float] = None) -> Dict:
+        """Execute shell command asynchronously, streaming its output line by line.
+
+        Every line goes to the log buffer and to on_output(stream, line) as it
+        arrives; only the last Config.max_output_lines of each stream are kept
+        for the returned result. The command runs in its own process group
+        under the ResourceGovernor's limits; the whole group is killed on
+        timeout (Config.command_timeout by default) or cancellation.
+        """
         try:
-            self.log(f"Executing: {command}")
-            
             if cwd is None:
                 cwd = str(self.project_dir) if self.project_dir.exists() else os.getcwd()
             
-            process = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd
-            )
+            tails = {"stdout": deque(maxlen=config.max_output_lines),
+                     "stderr": deque(maxlen=config.max_output_lines)}
+            counts = {"stdout": 0, "stderr": 0}
             
-            stdout, stderr = await process.communicate()
+            def collector(stream: str):
+                def on_line(line: str):
+                    tails[stream].append(line)
+                    counts[stream] += 1
+                    self.log(line, stream)
+                    if on_output:
+                        on_output(stream, line)
+                return on_line
+            
+            if self.scheduler.busy:
+                self.log(f"⏳ Waiting for a free command slot: {command}")
+            timeout = config.command_timeout if timeout is None else timeout
+            async with self.scheduler.slot(self.project_id):
+                await governor.admit(kind, self.log)
+                self.log(f"Executing: {command}")
+                start = time.monotonic()
+                started_at = time.time()
+                process = await asyncio.create_subprocess_shell(
+                    command,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=cwd,
+                    start_new_session=True
+                )
+                job = governor.track(process.pid, kind, command, self.log)
+                timed_out = False
+                io = asyncio.gather(
+                    read_lines(process.stdout, collector("stdout")),
+                    read_lines(process.stderr, collector("stderr")),
+                    process.wait()
+                )
+                try:
+                    if on_start:
+                        on_start(process.pid)
+                    done, _ = await asyncio.wait({io}, timeout=timeout or None)
+                    if not done:
+                        timed_out = True
+                        self.log(f"⏱️ Command timed out after {timeout:.0f}s, killing its process group: {command}",
+                                 "error")
+                        await governor.kill(process.pid, process)
+                        # Orphans that escaped the group may still hold the pipes open
+                        await asyncio.wait({io}, timeout=1.0)
+                except asyncio.CancelledError:
+                    await asyncio.shield(governor.kill(process.pid, process))
+                    raise
+                finally:
+                    if not io.done():
+                        io.cancel()
+                        with contextlib.suppress(asyncio.CancelledError):
+                            await io
+                    governor.untrack(process.pid)
+                duration = time.monotonic() - start
+            metrics.observe_command(self.project_id, kind, duration, process.returncode == 0)
             
             result = {
-                "success": process.returncode == 0,
+                "success": process.returncode == 0 and not timed_out,
                 "returncode": process.returncode,
-                "stdout": stdout.decode('utf-8'),
-                "stderr": stderr.decode('utf-8'),
+                "duration": round(duration, 2),
+                "stdout": "\n".join(tails["stdout"]),
+                "stderr": "\n".join(tails["stderr"]),
+                "truncated": any(counts[s] > len(tails[s]) for s in tails),
+                "peakRss": job["peakRss"],
                 "command": command
             }
+            if timed_out:
+                result["error"] = f"Timed out after {timeout:.0f}s"
+            elif job["killed"]:
+                result["error"] = f"Killed by the resource governor ({job['killed']})"
+            if self.store:
+                self.store.record_run(self.project_id, kind, result, started_at)
             
             if result["success"]:
                 self.log(f"✅ Command completed: {command}")
             else:
-                self.log(f"❌ Command failed: {command} - {result['stderr']}", "error")
+                self.log(f"❌ Command failed: {command} (exit code {process.returncode})", "error")
             
             return result
             
         except Exception as e:
             self.log(f"❌ Exception executing command: {str(e)}", "error")
-            return {
+            result = {
                 "success": False,
                 "error": str(e),
                 "command": command
             }
+            if self.store:
+                self.store.record_run(self.project_id, kind, result, time.time())
+            return result
 
     async def get_project_info(self) -> Dict:
         """Get comprehensive project information"""
@@ -162,110 +3145,188 @@ class DevToolAPI:
             if not self.project_dir.exists():
                 return {"error": "Project directory not found"}
             
-            package_json_path = self.project_dir / "package.json"
-            if not package_json_path.exists():
+            try:
+                manifest = await asyncio.to_thread(self.manifest.load)
+            except FileNotFoundError:
                 return {"error": "package.json not found"}
+            workspaces = await asyncio.to_thread(manifest.workspaces)
             
-            with open(package_json_path, 'r') as f:
-                package_data = json.load(f)
-            
-            # Get file statistics
-            file_count = sum(1 for _ in self.project_dir.rglob("*") if _.is_file())
-            
-            # Get dependencies info
-            deps = package_data.get("dependencies", {})
-            dev_deps = package_data.get("devDependencies", {})
+            # Get file statistics from the cached index (node_modules, dist... are skipped)
+            index = await asyncio.to_thread(self.index.refresh)
             
             # Check if dist exists
             dist_exists = (self.project_dir / "dist").exists()
             build_exists = (self.project_dir / "build").exists()
             
-            return {
-                "name": package_data.get("name", "Unknown"),
-                "version": package_data.get("version", "0.0.0"),
-                "type": package_data.get("type", "commonjs"),
-                "scripts": package_data.get("scripts", {}),
-                "dependencies": len(deps),
-                "devDependencies": len(dev_deps),
-                "totalFiles": file_count,
+            info = {
+                "name": manifest.data.get("name", "Unknown"),
+                "version": manifest.data.get("version", "0.0.0"),
+                "type": manifest.data.get("type", "commonjs"),
+                "scripts": manifest.scripts,
+                "dependencies": len(manifest.dependencies),
+                "devDependencies": len(manifest.dev_dependencies),
+                "totalFiles": index.file_count(),
+                "ignoredDirectories": index.ignored_dirs(),
                 "hasNodeModules": (self.project_dir / "node_modules").exists(),
                 "hasBuild": dist_exists or build_exists,
-                "framework": self.detect_framework(package_data)
+                "framework": manifest.framework
             }
+            if workspaces:
+                info["workspaces"] = [member.summary(self.project_dir) for member in workspaces]
+            return info
             
         except Exception as e:
             self.log(f"❌ Error getting project info: {str(e)}", "error")
             return {"error": str(e)}
 
     def detect_framework(self, package_data: Dict) -> str:
-        """Detect project framework from package.json"""
-        deps = {**package_data.get("dependencies", {}), **package_data.get("devDependencies", {})}
-        
-        if "react" in deps:
-            if "next" in deps:
-                return "nextjs"
-            return "react"
-        elif "vue" in deps:
-            if "@nuxt" in str(deps):
-                return "nuxt"
-            return "vue"
-        elif "@angular/core" in deps:
-            return "angular"
-        elif "svelte" in deps:
-            return "svelte"
-        else:
-            return "unknown"
+        """Detect project framework from package.json data (the manifest has it precomputed)"""
+        return detect_framework({**package_data.get("dependencies", {}), **package_data.get("devDependencies", {})})
+
+    async def install_dependencies(self, on_output: Optional[Callable[[str, str], None]] = None,
+                                   force: bool = False) -> Dict:
+        """Install project dependencies, skipping the install when the lockfile is unchanged"""
+        try:
+            plan = await asyncio.to_thread(install_plan, self.project_dir)
+        except OSError as e:
+            return {"error": f"Failed to read package.json: {str(e)}"}
+        
+        marker = plan["marker"] or {}
+        if plan["upToDate"] and not force:
+            marker["skips"] = marker.get("skips", 0) + 1
+            marker["totalTimeSaved"] = round(marker.get("totalTimeSaved", 0) + (marker.get("duration") or 0), 3)
+            await asyncio.to_thread(write_install_marker, self.project_dir, marker)
+            self.log(f"⚡ Install skipped: {plan['lockfile'] or 'package.json'} unchanged")
+            return {
+                "success": True,
+                "skipped": True,
+                "reason": "lockfile and node_modules marker match",
+                "lockfile": plan["lockfile"],
+                "timeSaved": marker.get("duration"),
+                "totalTimeSaved": marker["totalTimeSaved"],
+                "command": plan["command"]
+            }
+        
+        started = time.monotonic()
+        result = await self.execute_command(plan["command"], on_output=on_output, kind="install")
+        result["duration"] = round(time.monotonic() - started, 3)
+        result["skipped"] = False
+        result["lockfile"] = plan["lockfile"]
+        if result["success"]:
+            await asyncio.to_thread(write_install_marker, self.project_dir, {
+                "hash": plan["hash"],
+                "lockfile": plan["lockfile"],
+                "command": plan["command"],
+                "duration": result["duration"],
+                "timestamp": datetime.now().isoformat(),
+                "skips": marker.get("skips", 0),
+                "totalTimeSaved": marker.get("totalTimeSaved", 0)
+            })
+        return result
 
-    async def install_dependencies(self) -> Dict:
-        """Install project dependencies"""
-        return await self.execute_command("npm install")
+    async def build_project(self, on_output: Optional[Callable[[str, str], None]] = None,
+                            force: bool = False, profile: bool = False) -> Dict:
+        """Build project for production, failing when bundle budgets are exceeded.
 
-    async def build_project(self) -> Dict:
-        """Build project for production"""
+        The build is skipped when the input fingerprint matches the last
+        successful build and its output is intact (or a snapshot for that
+        fingerprint can be restored), unless force is set. With profile the
+        build always runs and the result carries a BuildProfiler breakdown.
+        """
         # First check if we have a build script
         try:
-            package_json = self.project_dir / "package.json"
-            with open(package_json, 'r') as f:
-                data = json.load(f)
-            
-            scripts = data.get("scripts", {})
-            if "build" in scripts:
-                return await self.execute_command("npm run build")
-            else:
-                return {"error": "No build script found in package.json"}
-                
+            scripts = (await asyncio.to_thread(self.manifest.load)).scripts
         except Exception as e:
             return {"error": f"Failed to read package.json: {str(e)}"}
+        
+        if "build" not in scripts:
+            return {"error": "No build script found in package.json"}
+        
+        async with self.build_lock:
+            return await self._build(scripts["build"], on_output, force, profile)
+
+    async def _build(self, script: str, on_output: Optional[Callable[[str, str], None]],
+                     force: bool, profile: bool) -> Dict:
+        fingerprint = await asyncio.to_thread(self.build_cache.fingerprint, script)
+        if not force and not profile:
+            cached = None
+            if await asyncio.to_thread(self.build_cache.is_fresh, fingerprint):
+                cached = "up-to-date"
+            elif await asyncio.to_thread(self.build_cache.restore_snapshot, fingerprint):
+                cached = "restored"
+            if cached:
+                saved = self.build_cache.last_duration()
+                self.log(f"⚡ Build skipped ({cached}), inputs unchanged")
+                return {
+                    "success": True,
+                    "cached": cached,
+                    "fingerprint": fingerprint,
+                    "savedSeconds": saved,
+                    "command": "npm run build"
+                }
+        
+        profiler = BuildProfiler(self.project_dir) if profile else None
+        if profiler:
+            def profiled_output(stream: str, line: str):
+                profiler.on_output(stream, line)
+                if on_output:
+                    on_output(stream, line)
+        
+        started = time.monotonic()
+        result = await self.execute_command("npm run build", on_output=profiled_output if profiler else on_output,
+                                            kind="build", on_start=profiler.start if profiler else None)
+        result["duration"] = round(time.monotonic() - started, 3)
+        result["cached"] = None
+        result["fingerprint"] = fingerprint
+        if profiler:
+            result["profile"] = await profiler.finish(result["success"])
+            self.log(f"⏱️ Build profile: {result['profile']['totalSeconds']}s, "
+                     f"slowest phase {result['profile']['slowestPhase']}")
+        if not result["success"]:
+            return result
+        
+        # Record the new bundle in the history and enforce budgets
+        analysis = await self.analyze_bundle()
+        if "error" not in analysis:
+            result["bundle"] = {key: analysis.get(key) for key in
+                                ("buildId", "totalSize", "totalGzipSize", "delta")}
+            violations = analysis.get("budgetViolations", [])
+            if violations:
+                result["success"] = False
+                result["budgetViolations"] = violations
+                self.log(f"❌ Bundle budget exceeded by {len(violations)} file(s)", "error")
+                return result
+        
+        # Only a build that passed its budgets may be skipped next time
+        output_dir = find_output_dir(self.project_dir)
+        if output_dir:
+            await asyncio.to_thread(self.build_cache.record, fingerprint, output_dir, result["duration"])
+        return result
 
     async def start_dev_server(self) -> Dict:
         """Start development server"""
-        if self.server_process and self.server_process.poll() is None:
+        if self.dev_server and self.dev_server.running:
             return {"error": "Server already running"}
         
         try:
             # Check for dev script
-            package_json = self.project_dir / "package.json"
-            with open(package_json, 'r') as f:
-                data = json.load(f)
-            
-            scripts = data.get("scripts", {})
+            scripts = (await asyncio.to_thread(self.manifest.load)).scripts
             if "dev" not in scripts:
                 return {"error": "No dev script found in package.json"}
             
-            # Start server in background
-            self.server_process = subprocess.Popen(
-                ["npm", "run", "dev"],
-                cwd=str(self.project_dir),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
+            # Start server in background, supervised so its output is always drained
+            self.dev_server = ManagedProcess("Development server", ["npm", "run", "dev"],
+                                             str(self.project_dir), self.log)
+            await self.dev_server.start()
+            ready = await self.dev_server.wait_ready(config.dev_ready_timeout)
             
             self.log("🚀 Development server started")
             return {
                 "success": True,
                 "message": "Development server started",
-                "pid": self.server_process.pid,
-                "url": f"http://127.0.0.1:{config.port}"
+                "pid": self.dev_server.process.pid,
+                "ready": ready,
+                "url": self.dev_server.url or f"http://127.0.0.1:{config.port}"
             }
             
         except Exception as e:
@@ -274,71 +3335,192 @@ class DevToolAPI:
 
     async def stop_dev_server(self) -> Dict:
         """Stop development server"""
-        if not self.server_process or self.server_process.poll() is not None:
+        if not self.dev_server or not self.dev_server.running:
             return {"error": "No server running"}
         
         try:
-            self.server_process.terminate()
-            self.server_process.wait(timeout=5)
-            self.log("⏹️ Development server stopped")
-            return {"success": True, "message": "Server stopped"}
-            
-        except subprocess.TimeoutExpired:
-            self.server_process.kill()
+            if await self.dev_server.stop():
+                self.log("⏹️ Development server stopped")
+                return {"success": True, "message": "Server stopped"}
             self.log("🔪 Development server forcefully killed")
             return {"success": True, "message": "Server forcefully stopped"}
         except Exception as e:
             return {"error": str(e)}
 
-    async def run_tests(self) -> Dict:
-        """Run project tests"""
-        return await self.execute_command("npm test")
+    async def dev_server_status(self) -> Dict:
+        """Live dev server stats: uptime, URL, RSS and CPU of its process tree"""
+        if not self.dev_server:
+            return {"running": False}
+        return await asyncio.to_thread(self.dev_server.stats)
+
+    async def dev_server_logs(self, cursor: int = 0, limit: int = 100) -> Dict:
+        """Output captured from the dev server since a cursor"""
+        if not self.dev_server:
+            return {"logs": [], "cursor": 0, "dropped": 0}
+        return self.dev_server.logs.since(cursor, limit)
+
+    def _scripts(self) -> Dict[str, str]:
+        try:
+            return self.manifest.load().scripts
+        except (OSError, ValueError):
+            return {}
+
+    def _report_path(self, name: str) -> Path:
+        report_dir = self.project_dir / ".devtool"
+        report_dir.mkdir(parents=True, exist_ok=True)
+        return report_dir / f"{name}-{uuid.uuid4().hex[:8]}.json"
+
+    async def _run_reported(self, command: str, report: Union["TestReport", "LintReport"], kind: str,
+                            on_output: Optional[Callable[[str, str], None]]) -> Dict:
+        """Run a command while its output feeds a report, then attach the report to the result"""
+        def tee(stream: str, line: str):
+            report.on_output(stream, line)
+            if on_output:
+                on_output(stream, line)
+        
+        result = await self.execute_command(command, on_output=tee, kind=kind)
+        result["report"] = await asyncio.to_thread(report.finish)
+        return result
+
+    def _record_tests(self, result: Dict, full_run: bool):
+        """Check the run's test durations against the history, then add it (full runs only)"""
+        report = result["report"]
+        timings = report.pop("timings")
+        if not timings:
+            return
+        report["regressions"] = self.test_history.regressions(timings)
+        if full_run:
+            self.test_history.record({**report, "timings": timings})
+
+    async def run_test_command(self, command: str, on_output: Optional[Callable[[str, str], None]] = None,
+                               full_run: bool = False) -> Dict:
+        """Run a Jest or Vitest command with its JSON reporter and attach the parsed report"""
+        runner = TestReport.detect_runner(command)
+        report = TestReport(runner, await asyncio.to_thread(self._report_path, "test-report") if runner else None,
+                            self.project_dir.resolve())
+        if runner:
+            command = f"{command} {report.reporter_args()}"
+        result = await self._run_reported(command, report, "test", on_output)
+        await asyncio.to_thread(self._record_tests, result, full_run)
+        return result
+
+    async def run_tests(self, on_output: Optional[Callable[[str, str], None]] = None) -> Dict:
+        """Run project tests; the result's report has per-file counts, failures and the slowest tests"""
+        script = (await asyncio.to_thread(self._scripts)).get("test", "")
+        runner = TestReport.detect_runner(script) if single_command(script) else None
+        report = TestReport(runner, await asyncio.to_thread(self._report_path, "test-report") if runner else None,
+                            self.project_dir.resolve())
+        command = f"npm test -- {report.reporter_args()}" if runner else "npm test"
+        result = await self._run_reported(command, report, "test", on_output)
+        await asyncio.to_thread(self._record_tests, result, True)
+        return result
+
+    async def test_history_slowest(self, limit: int = 10) -> Dict:
+        """Recent test runs and the slowest tests with their duration across them"""
+        return await asyncio.to_thread(self.test_history.slowest, limit)
+
+    async def run_history(self, since: Optional[float] = None, until: Optional[float] = None,
+                          command: Optional[str] = None, kind: Optional[str] = None,
+                          status: Optional[str] = None, limit: int = 100) -> Dict:
+        """Stored command runs, newest first, without their output"""
+        if not self.store:
+            return {"error": "History is disabled"}
+        runs = await asyncio.to_thread(self.store.runs, self.project_id, since, until, command, kind, status, limit)
+        return {"runs": runs, "count": len(runs)}
+
+    async def run_details(self, run_id: int) -> Dict:
+        """One stored run including its stdout/stderr tail"""
+        if not self.store:
+            return {"error": "History is disabled"}
+        run = await asyncio.to_thread(self.store.run, self.project_id, run_id)
+        return run or {"error": f"Run not found: {run_id}"}
+
+    async def log_history(self, since: Optional[float] = None, until: Optional[float] = None,
+                          levels: Optional[set] = None, limit: int = 500) -> Dict:
+        """Stored log entries in a time range, oldest first"""
+        if not self.store:
+            return {"error": "History is disabled"}
+        logs = await asyncio.to_thread(self.store.logs, self.project_id, since, until, levels, limit)
+        return {"logs": logs, "count": len(logs)}
 
-    async def run_linter(self) -> Dict:
-        """Run code linter"""
-        return await self.execute_command("npm run lint")
+    async def run_linter(self, on_output: Optional[Callable[[str, str], None]] = None) -> Dict:
+        """Run code linter; the result's report has per-file counts and diagnostics"""
+        script = (await asyncio.to_thread(self._scripts)).get("lint", "")
+        json_output = LintReport.supports_json(script)
+        report = LintReport(await asyncio.to_thread(self._report_path, "lint-report") if json_output else None,
+                            self.project_dir.resolve())
+        command = f"npm run lint -- {report.reporter_args()}" if json_output else "npm run lint"
+        return await self._run_reported(command, report, "lint", on_output)
+
+    async def run_checks(self, changed_only: bool = False, base: str = "HEAD", lint: bool = True,
+                         test: bool = True, on_output: Optional[Callable[[str, str], None]] = None) -> Dict:
+        """Lint and test in parallel; with changed_only just the files changed since base"""
+        try:
+            return await self.checks.run(changed_only, base, lint, test, on_output)
+        except Exception as e:
+            return {"error": str(e)}
 
     async def analyze_bundle(self) -> Dict:
         """Analyze bundle size and performance"""
         try:
             # Check if build exists
-            dist_dir = self.project_dir / "dist"
-            build_dir = self.project_dir / "build"
-            
-            target_dir = dist_dir if dist_dir.exists() else build_dir if build_dir.exists() else None
+            target_dir = find_output_dir(self.project_dir)
             
             if not target_dir:
                 return {"error": "No build directory found. Run build first."}
             
-            # Calculate bundle size
-            total_size = sum(f.stat().st_size for f in target_dir.rglob("*") if f.is_file())
+            analysis = await self.bundle_analyzer.analyze(target_dir, config.bundle_top_files)
+            totals = analysis["totals"]
+            
+            entry = await asyncio.to_thread(self.bundle_history.record, analysis, target_dir.name)
+            previous = self.bundle_history.get(entry["id"] - 1)
             
-            # Get file breakdown
-            files = []
-            for file_path in target_dir.rglob("*"):
-                if file_path.is_file():
-                    size = file_path.stat().st_size
-                    files.append({
-                        "name": file_path.name,
-                        "path": str(file_path.relative_to(target_dir)),
-                        "size": size,
-                        "sizeFormatted": self.format_size(size)
-                    })
+            budgets = []
+            if self.manifest.path.exists():
+                budgets = (await asyncio.to_thread(self.manifest.load)).data.get("bundlesize", [])
+            violations = check_budgets(budgets, target_dir.name, analysis["files"])
             
-            files.sort(key=lambda x: x["size"], reverse=True)
+            files = [{
+                "name": record["path"].rpartition("/")[2],
+                "path": record["path"],
+                "size": record["size"],
+                "sizeFormatted": self.format_size(record["size"]),
+                "gzipSize": record["gzip"],
+                "brotliSize": record["brotli"],
+                "type": record["type"],
+                "chunk": record["chunk"]
+            } for record in analysis["top"]]
             
             return {
-                "totalSize": total_size,
-                "totalSizeFormatted": self.format_size(total_size),
-                "fileCount": len(files),
-                "files": files[:20],  # Top 20 largest files
-                "buildDir": str(target_dir.name)
+                "totalSize": totals["size"],
+                "totalSizeFormatted": self.format_size(totals["size"]),
+                "totalGzipSize": totals["gzip"],
+                "totalGzipSizeFormatted": self.format_size(totals["gzip"]),
+                "totalBrotliSize": totals["brotli"],
+                "fileCount": len(analysis["files"]),
+                "files": files,  # Top N largest files
+                "byType": analysis["byType"],
+                "byChunk": analysis["byChunk"],
+                "precompressedVariants": analysis["precompressedVariants"],
+                "recompressedFiles": analysis["recompressed"],
+                "buildDir": str(target_dir.name),
+                "buildId": entry["id"],
+                "delta": entry["totals"]["size"] - previous["totals"]["size"] if previous else None,
+                "budgetViolations": violations
             }
             
         except Exception as e:
             self.log(f"❌ Bundle analysis failed: {str(e)}", "error")
             return {"error": str(e)}
 
+    async def bundle_history_list(self) -> List[Dict]:
+        """Recorded bundle analyses, oldest first"""
+        return await asyncio.to_thread(self.bundle_history.list)
+
+    async def bundle_diff(self, from_id: Optional[int] = None, to_id: Optional[int] = None) -> Dict:
+        """Size deltas between two recorded builds"""
+        return await asyncio.to_thread(self.bundle_history.diff, from_id, to_id)
+
     def format_size(self, size_bytes: int) -> str:
         """Format bytes to human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -351,12 +3533,14 @@ class DevToolAPI:
         """Create new project with specified framework"""
         if framework not in self.frameworks:
             return {"error": f"Unsupported framework: {framework}"}
+        if not self.PROJECT_NAME_RE.match(name or "") or name in (".", ".."):
+            return {"error": "Project name may only contain letters, digits, '.', '_' and '-'"}
         
         try:
             framework_config = self.frameworks[framework]
-            create_command = framework_config["commands"]["create"].format(name=name)
+            create_command = framework_config["commands"]["create"].format(name=shlex.quote(name))
             
-            result = await self.execute_command(create_command, cwd=str(Path.cwd()))
+            result = await self.execute_command(create_command, cwd=str(Path.cwd()), kind="create")
             
             if result["success"]:
                 self.log(f"✅ Created {framework} project: {name}")
@@ -371,7 +3555,8 @@ class DevToolAPI:
         except Exception as e:
             return {"error": str(e)}
 
-    async def deploy_project(self, platform: str) -> Dict:
+    async def deploy_project(self, platform: str,
+                             on_output: Optional[Callable[[str, str], None]] = None) -> Dict:
         """Deploy project to specified platform"""
         deploy_commands = {
             "vercel": "npx vercel --prod",
@@ -384,7 +3569,7 @@ class DevToolAPI:
             return {"error": f"Unsupported platform: {platform}"}
         
         command = deploy_commands[platform]
-        result = await self.execute_command(command)
+        result = await self.execute_command(command, on_output=on_output, kind="deploy")
         
         if result["success"]:
             self.log(f"🚀 Deployed to {platform}")
@@ -393,49 +3578,595 @@ class DevToolAPI:
 
     def get_logs(self, limit: int = 100) -> List[Dict]:
         """Get recent logs"""
-        return self.logs[-limit:] if limit else self.logs
+        return self.logs.tail(limit)
+
+    def get_logs_since(self, cursor: int, limit: int = 100, levels: Optional[set] = None,
+                       wait: float = 0) -> Dict:
+        """Get logs after a cursor, optionally long-polling for new entries"""
+        if wait > 0:
+            return self.logs.wait(cursor, min(wait, 30.0), limit, levels)
+        return self.logs.since(cursor, limit, levels)
+
+    async def shutdown(self):
+        """Stop this project's watch mode and dev server"""
+        if self.watch.active:
+            await self.watch.stop()
+        if self.dev_server and self.dev_server.running:
+            await self.stop_dev_server()
+
+    def _search_sync(self, query: str, regex: bool, case_sensitive: bool, glob: Optional[str],
+                     offset: int, limit: int) -> Dict:
+        start = time.monotonic()
+        index_stats = self.search_index.update()
+        stats = {}
+        matches = []
+        next_offset = None
+        for n, match in enumerate(self.search_index.search(query, regex, case_sensitive, glob, stats)):
+            if n < offset:
+                continue
+            if len(matches) == limit:
+                next_offset = n
+                break
+            matches.append(match)
+        return {
+            "success": True,
+            "query": query,
+            "matches": matches,
+            "offset": offset,
+            "nextOffset": next_offset,
+            "candidateFiles": stats.get("candidates", 0),
+            "indexedFiles": index_stats["indexed"],
+            "reindexedFiles": index_stats["updated"],
+            "durationMs": round((time.monotonic() - start) * 1000, 1)
+        }
 
-    async def read_file(self, file_path: str) -> Dict:
-        """Read file content"""
+    async def search(self, query: str, regex: bool = False, case_sensitive: bool = False,
+                     glob: Optional[str] = None, offset: int = 0, limit: int = 100) -> Dict:
+        """Search project files (literal or regex) through the trigram index, one page at a time"""
+        if not query:
+            return {"error": "Empty search query"}
+        limit = max(1, min(limit, config.search_max_results))
         try:
-            full_path = self.project_dir / file_path
-            if not full_path.exists():
-                return {"error": "File not found"}
-            
-            if full_path.stat().st_size > 1024 * 1024:  # 1MB limit
-                return {"error": "File too large"}
-            
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            return {
-                "success": True,
-                "content": content,
-                "path": file_path,
-                "size": len(content)
-            }
-            
+            return await asyncio.to_thread(self._search_sync, query, regex, case_sensitive, glob,
+                                           offset, limit)
+        except re.error as e:
+            return {"error": f"Invalid regex: {e}"}
+
+    def resolve_path(self, file_path: str) -> Path:
+        """Resolve a project-relative path, refusing anything outside the project"""
+        full_path = (self.project_dir / file_path).resolve()
+        root = self.project_dir.resolve()
+        if full_path != root and root not in full_path.parents:
+            raise ValueError(f"Path outside project: {file_path}")
+        return full_path
+
+    @staticmethod
+    def _decode_chunk(data: bytes, at_eof: bool) -> Tuple[str, int]:
+        """Decode UTF-8, leaving a multi-byte character split by the chunk boundary for the next read"""
+        for trim in range(0 if at_eof else 4):
+            try:
+                return data[:len(data) - trim].decode('utf-8'), len(data) - trim
+            except UnicodeDecodeError:
+                continue
+        return data.decode('utf-8', 'replace'), len(data)
+
+    def _read_file_sync(self, file_path: str, offset: int = 0, length: Optional[int] = None) -> Dict:
+        full_path = self.resolve_path(file_path)
+        length = min(length or config.file_chunk_size, config.file_chunk_size)
+        try:
+            f = open(full_path, 'rb')
+        except FileNotFoundError:
+            return {"error": "File not found"}
+        with f:
+            st = os.fstat(f.fileno())
+            if offset:
+                f.seek(offset)
+            data = f.read(length)
+        
+        end = offset + len(data)
+        content, consumed = self._decode_chunk(data, at_eof=end >= st.st_size)
+        end = offset + consumed
+        result = {
+            "success": True,
+            "content": content,
+            "path": file_path,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "offset": offset,
+            "nextOffset": end if end < st.st_size else None
+        }
+        if offset == 0 and end >= st.st_size:
+            # Whole file in hand: include its hash for conditional writes
+            result["hash"] = hashlib.sha256(data).hexdigest()
+        return result
+
+    async def read_file(self, file_path: str, offset: int = 0, length: Optional[int] = None) -> Dict:
+        """Read file content; large files are read in chunks of Config.file_chunk_size"""
+        try:
+            return await asyncio.to_thread(self._read_file_sync, file_path, offset, length)
         except Exception as e:
             return {"error": str(e)}
 
-    async def write_file(self, file_path: str, content: str) -> Dict:
-        """Write file content"""
-        try:
-            full_path = self.project_dir / file_path
-            full_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(full_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            self.log(f"📝 File saved: {file_path}")
-            return {"success": True, "message": "File saved successfully"}
+    async def read_files(self, file_paths: List[str], length: Optional[int] = None) -> Dict:
+        """Read several files in one request"""
+        results = await asyncio.gather(*(self.read_file(path, 0, length) for path in file_paths))
+        return {"files": dict(zip(file_paths, results))}
+
+    def _write_file_sync(self, file_path: str, content: str, if_mtime: Optional[int],
+                         if_hash: Optional[str]) -> Dict:
+        full_path = self.resolve_path(file_path)
+        with self.write_lock:
+            if if_mtime is not None or if_hash is not None:
+                try:
+                    st = os.stat(full_path)
+                    with open(full_path, 'rb') as f:
+                        current_hash = hashlib.sha256(f.read()).hexdigest() if if_hash is not None else None
+                    current_mtime = st.st_mtime_ns
+                except FileNotFoundError:
+                    current_mtime = current_hash = None
+                if (if_mtime is not None and if_mtime != current_mtime) or \
+                        (if_hash is not None and if_hash != current_hash):
+                    return {
+                        "error": "Precondition failed: file changed since it was read",
+                        "conflict": True,
+                        "path": file_path,
+                        "currentMtime": current_mtime,
+                        "currentHash": current_hash
+                    }
             
+            # Atomic replace: temp file in the same directory, fsync, rename
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            data = content.encode('utf-8')
+            fd, tmp_path = tempfile.mkstemp(dir=full_path.parent, prefix=f".{full_path.name}.", suffix=".tmp")
+            try:
+                # mkstemp creates 0600; keep the existing file's mode, or what open() would give a new one
+                try:
+                    mode = os.stat(full_path).st_mode & 0o7777
+                except FileNotFoundError:
+                    mode = 0o666 & ~UMASK
+                with os.fdopen(fd, 'wb') as f:
+                    os.fchmod(f.fileno(), mode)
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, full_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            dir_fd = os.open(full_path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            st = os.stat(full_path)
+        
+        return {
+            "success": True,
+            "message": "File saved successfully",
+            "path": file_path,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "hash": hashlib.sha256(data).hexdigest()
+        }
+
+    async def write_file(self, file_path: str, content: str, if_mtime: Optional[int] = None,
+                         if_hash: Optional[str] = None) -> Dict:
+        """Write file content atomically, optionally only if it still has the given mtime/hash"""
+        try:
+            result = await asyncio.to_thread(self._write_file_sync, file_path, content, if_mtime, if_hash)
+            if result.get("success"):
+                self.log(f"📝 File saved: {file_path}")
+            return result
         except Exception as e:
             return {"error": str(e)}
 
+    async def write_files(self, files: List[Dict]) -> Dict:
+        """Write several files in one request; each write is atomic on its own"""
+        results = []
+        for item in files:
+            results.append(await self.write_file(item.get("path", ""), item.get("content", ""),
+                                                 item.get("ifMtime"), item.get("ifHash")))
+        return {"success": all(r.get("success") for r in results), "files": results}
+
+class HistoryStore:
+    """SQLite history of command runs and log entries, shared by all projects.
+
+    Writes never touch the database on the caller's thread: they go into a
+    bounded queue drained by one writer thread, which commits everything that
+    arrived within Config.history_flush_interval in a single transaction
+    (group commit). Queries use their own connection; WAL mode lets them run
+    while the writer commits, and they don't wait for the queue, so a write
+    shows up within about one flush interval. When the data grows past
+    Config.history_max_bytes the oldest log entries (and, once few are left,
+    the oldest runs) are deleted a quarter at a time and the space handed
+    back with an incremental vacuum.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            project TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            command TEXT NOT NULL,
+            started REAL NOT NULL,
+            duration REAL,
+            returncode INTEGER,
+            status TEXT NOT NULL,
+            peak_rss INTEGER,
+            error TEXT,
+            stdout TEXT,
+            stderr TEXT,
+            truncated INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS runs_started ON runs (project, started);
+        CREATE INDEX IF NOT EXISTS runs_command ON runs (project, command, started);
+        CREATE INDEX IF NOT EXISTS runs_kind ON runs (project, kind, started);
+        CREATE INDEX IF NOT EXISTS runs_status ON runs (project, status, started);
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY,
+            project TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            level TEXT NOT NULL,
+            message TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS logs_timestamp ON logs (project, timestamp);
+    """
+    RUN_COLUMNS = ("id", "project", "kind", "command", "started", "duration", "returncode", "status",
+                   "peak_rss", "error", "truncated")
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.queue: "queue.Queue[Optional[Tuple[str, Tuple]]]" = queue.Queue(config.history_queue)
+        self.dropped = 0
+        self.written = 0
+        self.commits = 0
+        self.pruned = 0
+        writer = self._connect()
+        # In WAL mode (and once tables exist) auto_vacuum only changes through a VACUUM;
+        # databases created before this was set get it once, later opens skip it
+        if writer.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            writer.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            writer.execute("VACUUM")
+        writer.executescript(self.SCHEMA)
+        self.reader = self._connect()
+        self.read_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._write_loop, args=(writer,), name="history-writer",
+                                       daemon=True)
+        self.thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")  # WAL stays consistent; a crash may lose the last commit
+        conn.execute(f"PRAGMA journal_size_limit = {8 * 1024 * 1024}")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _put(self, sql: str, params: Tuple):
+        try:
+            self.queue.put_nowait((sql, params))
+        except queue.Full:
+            # Never block a command or the event loop on history
+            self.dropped += 1
+
+    def record_run(self, project: str, kind: str, result: Dict, started: float):
+        """Queue a finished execute_command result"""
+        limit = config.history_output_bytes
+        if result.get("success"):
+            status = "success"
+        elif str(result.get("error", "")).startswith("Timed out"):
+            status = "timeout"
+        elif str(result.get("error", "")).startswith("Killed"):
+            status = "killed"
+        elif result.get("returncode") is None:
+            status = "error"
+        else:
+            status = "failed"
+        stdout, stderr = result.get("stdout") or "", result.get("stderr") or ""
+        self._put("INSERT INTO runs (project, kind, command, started, duration, returncode, status, peak_rss,"
+                  " error, stdout, stderr, truncated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                  (project, kind, result.get("command", ""), started, result.get("duration"),
+                   result.get("returncode"), status, result.get("peakRss"), result.get("error"),
+                   stdout[-limit:], stderr[-limit:],
+                   int(bool(result.get("truncated")) or len(stdout) > limit or len(stderr) > limit)))
+
+    def record_log(self, project: str, entry: Dict):
+        self._put("INSERT INTO logs (project, timestamp, level, message) VALUES (?, ?, ?, ?)",
+                  (project, datetime.fromisoformat(entry["timestamp"]).timestamp(), entry["level"],
+                   entry["message"][:config.max_line_length]))
+
+    def _write_loop(self, conn: sqlite3.Connection):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            batch = [item]
+            deadline = time.monotonic() + config.history_flush_interval
+            stop = False
+            while len(batch) < config.history_batch:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                conn.execute("BEGIN")
+                for sql, params in batch:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+                self.written += len(batch)
+                self.commits += 1
+            except sqlite3.Error as e:
+                logger.warning(f"History write failed ({len(batch)} entries lost): {e}")
+                with contextlib.suppress(sqlite3.Error):
+                    conn.execute("ROLLBACK")
+            for _ in range(len(batch) + stop):
+                self.queue.task_done()
+            self._enforce_retention(conn)
+            if stop:
+                break
+        conn.close()
+
+    def _size(self, conn: sqlite3.Connection, allocated: bool = False) -> int:
+        """Bytes in use, or with allocated the file size including free pages"""
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        if not allocated:
+            pages -= conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_size * pages
+
+    def _enforce_retention(self, conn: sqlite3.Connection):
+        # Two PRAGMA reads per commit; free pages count too, so a lowered cap still shrinks the file
+        if self._size(conn, allocated=True) <= config.history_max_bytes:
+            return
+        try:
+            while self._size(conn) > config.history_max_bytes:
+                # Logs go first; runs are fewer and worth more, so they only go once logs are nearly gone
+                deleted = 0
+                for table in ("logs", "runs"):
+                    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    if count:
+                        cutoff = conn.execute(f"SELECT id FROM {table} ORDER BY id LIMIT 1 OFFSET ?",
+                                              (max(1, count // 4) - 1,)).fetchone()[0]
+                        deleted += conn.execute(f"DELETE FROM {table} WHERE id <= ?", (cutoff,)).rowcount
+                    if count >= 1000:
+                        break
+                self.pruned += deleted
+                if not deleted:
+                    break
+            # Frees one page per step; executescript steps it to completion, execute() only once
+            conn.executescript("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logger.warning(f"History retention failed: {e}")
+
+    def _query(self, sql: str, params: List) -> List[Dict]:
+        with self.read_lock:
+            return [dict(row) for row in self.reader.execute(sql, params)]
+
+    def runs(self, project: str, since: Optional[float] = None, until: Optional[float] = None,
+             command: Optional[str] = None, kind: Optional[str] = None, status: Optional[str] = None,
+             limit: int = 100) -> List[Dict]:
+        """Runs newest first (page with until); command matches as a prefix; filters use the indexes"""
+        where, params = ["project = ?"], [project]
+        if since is not None:
+            where.append("started >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("started < ?")
+            params.append(until)
+        if command:
+            # A range instead of LIKE so the (project, command) index applies
+            where.append("command >= ? AND command < ?")
+            params.extend([command, command + "\uffff"])
+        if kind:
+            where.append("kind = ?")
+            params.append(kind)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        params.append(limit)
+        return self._query(f"SELECT {', '.join(self.RUN_COLUMNS)} FROM runs WHERE {' AND '.join(where)} "
+                           f"ORDER BY started DESC LIMIT ?", params)
+
+    def run(self, project: str, run_id: int) -> Optional[Dict]:
+        rows = self._query("SELECT * FROM runs WHERE project = ? AND id = ?", [project, run_id])
+        return rows[0] if rows else None
+
+    def logs(self, project: str, since: Optional[float] = None, until: Optional[float] = None,
+             levels: Optional[set] = None, limit: int = 500) -> List[Dict]:
+        """The latest log entries within the time range, oldest first"""
+        where, params = ["project = ?"], [project]
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(until)
+        if levels:
+            where.append(f"level IN ({', '.join('?' * len(levels))})")
+            params.extend(sorted(levels))
+        params.append(limit)
+        # The newest entries within the range, returned oldest first
+        rows = self._query(f"SELECT id, timestamp, level, message FROM logs WHERE {' AND '.join(where)} "
+                           f"ORDER BY timestamp DESC LIMIT ?", params)
+        rows.reverse()
+        return rows
+
+    def stats(self) -> Dict:
+        with self.read_lock:
+            runs = self.reader.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            logs = self.reader.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+            size = self._size(self.reader)
+        return {"path": str(self.path), "bytes": size, "maxBytes": config.history_max_bytes, "runs": runs,
+                "logs": logs, "written": self.written, "commits": self.commits, "dropped": self.dropped,
+                "pruned": self.pruned, "queued": self.queue.qsize()}
+
+    def close(self):
+        """Commit what is queued and stop the writer"""
+        self.queue.put(None)
+        self.thread.join(timeout=10)
+        with self.read_lock:
+            self.reader.close()
+
+class Workspace:
+    """Registry of projects, each with its own DevToolAPI (dev server, jobs, logs, caches).
+
+    Projects are stored in Config.workspace_file as {id: path}; the
+    Config.project_dir project is always present and is the default for
+    unprefixed API routes. DevToolAPI instances are created on first use and
+    share one CommandScheduler and one HistoryStore.
+    """
+
+    def __init__(self, path: Optional[Path] = None, default_dir: Optional[str] = None,
+                 history_db: Optional[str] = None):
+        self.path = Path(path or config.workspace_file)
+        self.scheduler = CommandScheduler()
+        history_db = config.history_db if history_db is None else history_db
+        self.store = None
+        if history_db:
+            try:
+                self.store = HistoryStore(history_db)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"History disabled, could not open {history_db}: {e}")
+        self.projects: Dict[str, str] = {}
+        self.apis: Dict[str, DevToolAPI] = {}
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.projects = json.load(f).get("projects", {})
+        except (OSError, ValueError):
+            pass
+        self.default_id = self._register(default_dir or config.project_dir)
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"projects": self.projects}, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def _register(self, project_dir: str, project_id: Optional[str] = None) -> str:
+        project_dir = str(Path(project_dir).expanduser().resolve())
+        with self.lock:
+            for existing_id, existing_dir in self.projects.items():
+                if existing_dir == project_dir:
+                    return existing_id
+            base = re.sub(r'[^a-z0-9._-]+', '-', (project_id or Path(project_dir).name).lower()).strip('-')
+            base = base or "project"
+            new_id, n = base, 2
+            while new_id in self.projects:
+                new_id, n = f"{base}-{n}", n + 1
+            self.projects[new_id] = project_dir
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"Could not save workspace file {self.path}: {e}")
+            return new_id
+
+    def get(self, project_id: Optional[str] = None) -> DevToolAPI:
+        """The DevToolAPI of a project (the default one if no ID); KeyError if unknown"""
+        project_id = project_id or self.default_id
+        with self.lock:
+            api = self.apis.get(project_id)
+            if api is None:
+                api = DevToolAPI(self.projects[project_id], project_id, self.scheduler, self.store)
+                self.apis[project_id] = api
+            return api
+
+    async def add(self, project_dir: str, project_id: Optional[str] = None) -> Dict:
+        if not project_dir or not Path(project_dir).expanduser().is_dir():
+            return {"error": f"Project directory not found: {project_dir}"}
+        # Only real projects: registering / or $HOME would expose it to the file routes
+        if not (Path(project_dir).expanduser() / "package.json").is_file():
+            return {"error": f"No package.json in {project_dir}"}
+        new_id = self._register(project_dir, project_id)
+        return {"success": True, "id": new_id, "path": self.projects[new_id]}
+
+    async def remove(self, project_id: str) -> Dict:
+        if project_id == self.default_id:
+            return {"error": "The default project can't be removed"}
+        if project_id not in self.projects:
+            return {"error": f"Unknown project: {project_id}"}
+        api = self.apis.get(project_id)
+        if api and any(job.active for job in api.jobs.jobs.values()):
+            return {"error": f"Project {project_id} has jobs running"}
+        if api:
+            await api.shutdown()
+            del self.apis[project_id]
+        with self.lock:
+            del self.projects[project_id]
+            self._save()
+        return {"success": True, "id": project_id}
+
+    async def list(self) -> Dict:
+        projects = []
+        for project_id, project_dir in self.projects.items():
+            api = self.apis.get(project_id)
+            projects.append({
+                "id": project_id,
+                "path": project_dir,
+                "default": project_id == self.default_id,
+                "loaded": api is not None,
+                "devServerRunning": bool(api and api.dev_server and api.dev_server.running),
+                "activeJobs": sum(1 for job in api.jobs.jobs.values() if job.active) if api else 0
+            })
+        return {"projects": projects, "scheduler": self.scheduler.stats()}
+
+    async def shutdown(self):
+        for api in list(self.apis.values()):
+            await api.shutdown()
+        if self.store:
+            await asyncio.to_thread(self.store.close)
+
+class EventLoopThread:
+    """Runs one long-lived asyncio event loop in a background thread.
+
+    HTTP handler threads submit DevToolAPI coroutines to it, so a slow
+    build no longer blocks requests served by other threads.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="devtool-loop", daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self.thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the shared loop and wait for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def stop(self):
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+GZIP_MIN_BYTES = 1024  # smaller bodies aren't worth compressing
+
+def file_etag(st: os.stat_result) -> str:
+    """ETag for file reads, from mtime and size (no need to hash the content)"""
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
 class APIRequestHandler(BaseHTTPRequestHandler):
-    def __init__(self, api_instance, *args, **kwargs):
-        self.api = api_instance
+    # Path segments that are ids, collapsed in the route label so /metrics stays bounded
+    ROUTE_ID_RE = re.compile(r'^(/api/(?:jobs|history/runs|project/build/profiles))/[^/]+')
+
+    def __init__(self, workspace, loop_thread, *args, **kwargs):
+        self.workspace = workspace
+        self.api: Optional[DevToolAPI] = None
+        self.loop_thread = loop_thread
         super().__init__(*args, **kwargs)
 
     def do_GET(self):
@@ -448,86 +4179,523 @@ class APIRequestHandler(BaseHTTPRequestHandler):
         self._send_cors_headers()
         self.end_headers()
 
+    def _origin_allowed(self) -> bool:
+        """Requests without an Origin (curl, scripts) pass; browser pages only from Config.allowed_origins"""
+        origin = self.headers.get('Origin')
+        return origin is None or origin in config.allowed_origins
+
     def _send_cors_headers(self):
-        self.send_header('Access-Control-Allow-Origin', '*')
+        origin = self.headers.get('Origin')
+        self.send_header('Vary', 'Origin')
+        if origin not in config.allowed_origins:
+            return
+        self.send_header('Access-Control-Allow-Origin', origin)
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match, If-Match')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+
+    def send_response(self, code, message=None):
+        self.status = code
+        super().send_response(code, message)
 
     def _handle_request(self):
+        """Dispatch one request, timing it for /metrics"""
+        start = time.perf_counter()
+        self.route = "other"
+        self.status = 200
+        try:
+            self._dispatch()
+        finally:
+            metrics.observe_request(self.route, self.command, self.status, time.perf_counter() - start)
+
+    def _dispatch(self):
         try:
             parsed = urlparse(self.path)
             path = parsed.path
             query = parse_qs(parsed.query)
             
-            # Handle async endpoints
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            # Async endpoints run on the shared event loop
+            run = self.loop_thread.run
             
-            if path == '/api/project/info':
-                result = loop.run_until_complete(self.api.get_project_info())
+            # /api/projects/<id>/<route> (or ?project=<id>) addresses a workspace project
+            project_id = query.get('project', [None])[0]
+            if path.startswith('/api/projects/'):
+                project_id, _, route = path[len('/api/projects/'):].partition('/')
+                path = f"/api/{route}"
+            if not self._origin_allowed():
+                # Pages from other sites must not drive builds or touch project files
+                return self._send_json({"error": "Origin not allowed"}, status=403)
+            try:
+                self.api = self.workspace.get(project_id)
+            except KeyError:
+                return self._send_json({"error": f"Unknown project: {project_id}"}, status=404)
+            # Label by the route alone; the project is in the path prefix or query, never here
+            self.route = self.ROUTE_ID_RE.sub(r'\1/<id>', path)
+            
+            if path == '/metrics':
+                return self._send_body(metrics.render(self._workspace_gauges()).encode(),
+                                       'text/plain; version=0.0.4; charset=utf-8')
+            elif path == '/api/resources':
+                result = governor.stats()
+            elif path == '/api/metrics/history':
+                since = float(query.get('since', [0])[0])
+                result = metrics.history(query.get('series', ['commands'])[0], since,
+                                         query.get('kind', [None])[0], project_id)
+            elif path == '/api/workspace':
+                result = run(self.workspace.list())
+            elif path in ('/api/workspace/add', '/api/workspace/remove') and self.command != 'POST':
+                return self._send_json({"error": "Use POST"}, status=405)
+            elif path == '/api/workspace/add':
+                body = self._read_json_body()
+                result = run(self.workspace.add(body.get("path") or query.get('path', [''])[0],
+                                                body.get("id") or query.get('id', [None])[0]))
+            elif path == '/api/workspace/remove':
+                result = run(self.workspace.remove(query.get('id', [''])[0]))
+            elif path == '/api/project/info':
+                result = run(self.api.get_project_info())
             elif path == '/api/project/install':
-                result = loop.run_until_complete(self.api.install_dependencies())
+                force = query.get('force', ['0'])[0] in ('1', 'true')
+                result = run(self.api.install_dependencies(force=force))
             elif path == '/api/project/build':
-                result = loop.run_until_complete(self.api.build_project())
+                force = query.get('force', ['0'])[0] in ('1', 'true')
+                profile = query.get('profile', ['0'])[0] in ('1', 'true')
+                result = run(self.api.build_project(force=force, profile=profile))
+            elif path == '/api/project/build/profiles':
+                result = BuildProfiler.list(self.api.project_dir)
+            elif path.startswith('/api/project/build/profiles/'):
+                return self._send_profile(path[len('/api/project/build/profiles/'):], query)
             elif path == '/api/project/dev/start':
-                result = loop.run_until_complete(self.api.start_dev_server())
+                result = run(self.api.start_dev_server())
             elif path == '/api/project/dev/stop':
-                result = loop.run_until_complete(self.api.stop_dev_server())
+                result = run(self.api.stop_dev_server())
+            elif path == '/api/project/dev/status':
+                result = run(self.api.dev_server_status())
+            elif path == '/api/project/dev/logs':
+                cursor = int(query.get('since', [0])[0])
+                limit = int(query.get('limit', [100])[0])
+                result = run(self.api.dev_server_logs(cursor, limit))
             elif path == '/api/project/test':
-                result = loop.run_until_complete(self.api.run_tests())
+                result = run(self.api.run_tests())
+            elif path == '/api/project/test/history':
+                try:
+                    limit = int(query.get('limit', [10])[0])
+                except ValueError:
+                    limit = 0
+                if limit < 1:
+                    return self._send_json({"error": "limit must be a positive integer"}, status=400)
+                result = run(self.api.test_history_slowest(limit))
             elif path == '/api/project/lint':
-                result = loop.run_until_complete(self.api.run_linter())
+                result = run(self.api.run_linter())
+            elif path == '/api/project/check':
+                only = query.get('only', [None])[0]
+                result = run(self.api.run_checks(changed_only=query.get('changed', ['0'])[0] in ('1', 'true'),
+                                                 base=query.get('base', ['HEAD'])[0],
+                                                 lint=only in (None, 'lint'), test=only in (None, 'test')))
             elif path == '/api/project/analyze':
-                result = loop.run_until_complete(self.api.analyze_bundle())
+                result = run(self.api.analyze_bundle())
+            elif path == '/api/project/analyze/history':
+                result = run(self.api.bundle_history_list())
+            elif path == '/api/project/analyze/diff':
+                try:
+                    from_id = int(query['from'][0]) if 'from' in query else None
+                    to_id = int(query['to'][0]) if 'to' in query else None
+                except ValueError:
+                    return self._send_json({"error": "from and to must be build ids"}, status=400)
+                result = run(self.api.bundle_diff(from_id, to_id))
+            elif path == '/api/history':
+                result = self.workspace.store.stats() if self.workspace.store else {"enabled": False}
+            elif path == '/api/history/runs':
+                result = run(self.api.run_history(
+                    float(query['since'][0]) if 'since' in query else None,
+                    float(query['until'][0]) if 'until' in query else None,
+                    query.get('command', [None])[0], query.get('kind', [None])[0],
+                    query.get('status', [None])[0], int(query.get('limit', [100])[0])))
+            elif path.startswith('/api/history/runs/'):
+                result = run(self.api.run_details(int(path[len('/api/history/runs/'):])))
+            elif path == '/api/history/logs':
+                result = run(self.api.log_history(
+                    float(query['since'][0]) if 'since' in query else None,
+                    float(query['until'][0]) if 'until' in query else None,
+                    set(query['level'][0].split(',')) if 'level' in query else None,
+                    int(query.get('limit', [500])[0])))
+            elif path == '/api/logs' and ('since' in query or 'level' in query):
+                limit = int(query.get('limit', [100])[0])
+                levels = set(query['level'][0].split(',')) if 'level' in query else None
+                if 'since' in query:
+                    cursor = int(query['since'][0])
+                else:
+                    cursor = max(self.api.logs.oldest_seq, self.api.logs.next_seq - limit)
+                wait = float(query.get('wait', [0])[0])
+                result = self.api.get_logs_since(cursor, limit, levels, wait)
             elif path == '/api/logs':
                 limit = int(query.get('limit', [100])[0])
                 result = self.api.get_logs(limit)
+            elif path == '/api/watch/start':
+                actions = query['actions'][0].split(',') if 'actions' in query else None
+                debounce = float(query['debounce'][0]) if 'debounce' in query else None
+                result = run(self.api.watch.start(actions, debounce))
+            elif path == '/api/watch/stop':
+                result = run(self.api.watch.stop())
+            elif path == '/api/watch/status':
+                result = self.api.watch.status()
+            elif path == '/api/watch/events':
+                return self._stream_events(self.api.watch.events, query)
+            elif path == '/api/files/read':
+                body = self._read_json_body()
+                result = run(self.api.read_files(body.get("paths", []), body.get("length")))
+            elif path == '/api/files/write':
+                result = run(self.api.write_files(self._read_json_body().get("files", [])))
+            elif path == '/api/search' and query.get('stream', ['0'])[0] in ('1', 'true'):
+                return self._stream_search(query)
+            elif path == '/api/search':
+                result = run(self.api.search(*self._search_params(query)))
+            elif path == '/api/files/stream':
+                return self._get_file({**query, 'raw': ['1']})
+            elif path == '/api/files' and self.command == 'POST':
+                return self._put_file(query)
+            elif path == '/api/files':
+                return self._get_file(query)
+            elif path == '/api/project/create':
+                if self.command != 'POST':
+                    return self._send_json({"error": "Use POST"}, status=405)
+                body = self._read_json_body()
+                name = body.get("name") or query.get('name', [''])[0]
+                framework = body.get("framework") or query.get('framework', ['react'])[0]
+                result = run(self.api.create_project(name, framework))
+            elif path == '/api/jobs':
+                result = run(self.api.jobs.list())
+            elif path.startswith('/api/jobs/') and path.endswith('/stream'):
+                return self._stream_job(path[len('/api/jobs/'):-len('/stream')], query)
+            elif path.startswith('/api/jobs/') and self.command == 'POST':
+                params = {key: values[0] for key, values in query.items()}
+                result = run(self.api.jobs.submit(path[len('/api/jobs/'):], params))
+            elif path.startswith('/api/jobs/'):
+                result = run(self.api.jobs.get(path[len('/api/jobs/'):]))
             else:
+                self.route = "other"
                 result = {"error": "Endpoint not found"}
             
-            loop.close()
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self._send_cors_headers()
-            self.end_headers()
-            
-            response = json.dumps(result, indent=2)
-            self.wfile.write(response.encode())
+            self._send_json(result, pretty=query.get('pretty', ['0'])[0] in ('1', 'true'))
             
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
+            self._send_json({"error": str(e)}, status=500)
+
+    def _workspace_gauges(self) -> Dict[str, Tuple[str, float]]:
+        scheduler = self.workspace.scheduler.stats()
+        apis = list(self.workspace.apis.values())
+        return {
+            "devtool_commands_capacity": ("Global cap on commands running at once", scheduler["capacity"]),
+            "devtool_commands_running": ("Commands running across all projects", sum(scheduler["running"].values())),
+            "devtool_commands_waiting": ("Commands waiting for a slot", sum(scheduler["waiting"].values())),
+            "devtool_projects_loaded": ("Workspace projects with live state", len(apis)),
+            "devtool_jobs_active": ("Queued or running background jobs",
+                                    sum(1 for api in apis for job in api.jobs.jobs.values() if job.active)),
+            "devtool_memory_available_bytes": ("MemAvailable from /proc/meminfo",
+                                               read_meminfo().get("MemAvailable", 0)),
+            "devtool_children_rss_bytes": ("RSS of all governed process trees",
+                                           sum(job["rss"] for job in governor.jobs.values())),
+            "devtool_commands_waiting_memory": ("Commands waiting for free memory", governor.waiting),
+            "devtool_children_killed": ("Process trees killed for exceeding the memory cap", governor.killed),
+        }
+
+    def _send_json(self, result, status: int = 200, pretty: bool = False, headers: Optional[Dict] = None):
+        """Compact JSON unless ?pretty=1 was asked for"""
+        if pretty:
+            body = json.dumps(result, indent=2)
+        else:
+            body = json.dumps(result, separators=(',', ':'))
+        self._send_body(body.encode(), 'application/json', status, headers)
+
+    def _send_body(self, body: bytes, content_type: str, status: int = 200, headers: Optional[Dict] = None):
+        """Send a complete response, gzipped when the client accepts it and it's worth it"""
+        accepted = self.headers.get('Accept-Encoding', '')
+        compress = len(body) >= GZIP_MIN_BYTES and 'gzip' in accepted
+        if compress:
+            body = gzip.compress(body, compresslevel=6)
+        
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_modified(self, etag: str) -> bool:
+        """Answer 304 if the client's cached copy (If-None-Match) is still current"""
+        candidates = self.headers.get('If-None-Match', '')
+        if etag not in [tag.strip() for tag in candidates.split(',')] and candidates.strip() != '*':
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self._send_cors_headers()
+        self.end_headers()
+        return True
+
+    def _get_file(self, query: Dict):
+        """GET /api/files: JSON (chunked for large files) or raw bytes with ?raw=1, with ETag revalidation"""
+        file_path = query.get('path', [''])[0]
+        raw = query.get('raw', ['0'])[0] in ('1', 'true')
+        try:
+            full_path = self.api.resolve_path(file_path)
+            st = os.stat(full_path)
+        except (OSError, ValueError) as e:
+            return self._send_json({"error": "File not found" if isinstance(e, OSError) else str(e)}, status=404)
+        
+        etag = file_etag(st)
+        if self._not_modified(etag):
+            return
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        
+        if not raw:
+            offset = int(query.get('offset', [0])[0])
+            length = int(query['length'][0]) if 'length' in query else None
+            result = self.loop_thread.run(self.api.read_file(file_path, offset, length))
+            return self._send_json(result, pretty=query.get('pretty', ['0'])[0] in ('1', 'true'),
+                                   headers=headers)
+        
+        content_type = mimetypes.guess_type(full_path.name)[0] or 'application/octet-stream'
+        if st.st_size <= config.file_chunk_size:
+            return self._send_body(full_path.read_bytes(), content_type, headers=headers)
+        self._stream_file(full_path, content_type, headers)
+
+    def _put_file(self, query: Dict):
+        """POST /api/files: JSON body {path, content, ifMtime, ifHash}, or the raw file bytes with ?path="""
+        # Only content types a browser can't send cross-site without a CORS preflight
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('application/json'):
+            body = self._read_json_body()
+        elif content_type.startswith('application/octet-stream'):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                body = {
+                    "path": query.get('path', [''])[0],
+                    "content": self.rfile.read(length).decode('utf-8')
+                }
+            except UnicodeDecodeError:
+                return self._send_json({"error": "Body is not valid UTF-8"}, status=400)
+            if_match = self.headers.get('If-Match', '').strip()
+            if if_match == '*':
+                # Any current version will do, as long as the file exists
+                try:
+                    exists = self.api.resolve_path(body["path"]).is_file()
+                except ValueError as e:
+                    return self._send_json({"error": str(e)}, status=400)
+                if not exists:
+                    return self._send_json({"error": "File does not exist", "conflict": True}, status=412)
+            elif if_match:
+                # An ETag from a previous read encodes the mtime it was taken at
+                try:
+                    body["ifMtime"] = int((if_match[2:] if if_match.startswith('W/') else if_match).strip('"').split('-')[0], 16)
+                except ValueError:
+                    return self._send_json({"error": f"Malformed If-Match: {if_match}", "conflict": True},
+                                           status=412)
+        else:
+            return self._send_json({"error": "Send application/json or application/octet-stream"}, status=415)
+        
+        result = self.loop_thread.run(self.api.write_file(
+            body.get("path", ""), body.get("content", ""), body.get("ifMtime"), body.get("ifHash")))
+        if result.get("conflict"):
+            return self._send_json(result, status=412)
+        headers = {'ETag': f'"{result["mtime"]:x}-{result["size"]:x}"'} if result.get("success") else None
+        self._send_json(result, headers=headers)
+
+    def _read_json_body(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _stream_file(self, full_path: Path, content_type: str, headers: Dict):
+        """Send a large file as raw bytes, copied in chunks rather than loaded whole"""
+        with open(full_path, 'rb') as f:
+            self.send_response(200)
+            self.send_header('Content-type', content_type)
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            for name, value in headers.items():
+                self.send_header(name, value)
             self._send_cors_headers()
             self.end_headers()
-            
-            error_response = json.dumps({"error": str(e)})
-            self.wfile.write(error_response.encode())
+            try:
+                shutil.copyfileobj(f, self.wfile, 64 * 1024)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    @staticmethod
+    def _search_params(query: Dict) -> Tuple:
+        flag = lambda name: query.get(name, ['0'])[0] in ('1', 'true')
+        return (query.get('q', [''])[0], flag('regex'), flag('case'), query.get('glob', [None])[0],
+                int(query.get('offset', [0])[0]), int(query.get('limit', [100])[0]))
+
+    def _stream_search(self, query: Dict):
+        """Stream search matches as Server-Sent Events while the candidate files are scanned"""
+        text, regex, case_sensitive, glob, offset, limit = self._search_params(query)
+        limit = max(1, min(limit, config.search_max_results))
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self._send_cors_headers()
+        self.end_headers()
+        
+        try:
+            if not text:
+                raise ValueError("Empty search query")
+            self.api.search_index.update()
+            sent = 0
+            next_offset = None
+            for n, match in enumerate(self.api.search_index.search(text, regex, case_sensitive, glob)):
+                if n < offset:
+                    continue
+                if sent == limit:
+                    next_offset = n
+                    break
+                self.wfile.write(f"event: match\ndata: {json.dumps(match)}\n\n".encode())
+                self.wfile.flush()
+                sent += 1
+            done = {"matches": sent, "offset": offset, "nextOffset": next_offset}
+            self.wfile.write(f"event: done\ndata: {json.dumps(done)}\n\n".encode())
+        except (re.error, ValueError) as e:
+            self.wfile.write(f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_profile(self, profile_id: str, query: Dict):
+        """A saved build profile, or with ?trace=1 its Chrome trace file"""
+        if not re.fullmatch(r'[\w-]+', profile_id):
+            return self._send_json({"error": "Invalid profile id"}, status=400)
+        suffix = ".trace.json" if query.get('trace', ['0'])[0] in ('1', 'true') else ".json"
+        path = self.api.project_dir / ".devtool" / "build-profiles" / f"{profile_id}{suffix}"
+        try:
+            body = path.read_bytes()
+        except OSError:
+            return self._send_json({"error": "Profile not found"}, status=404)
+        headers = {'Content-Disposition': f'attachment; filename="{path.name}"'} if suffix != ".json" else None
+        self._send_body(body, 'application/json', headers=headers)
+
+    def _stream_job(self, job_id: str, query: Dict):
+        """Stream job output as Server-Sent Events until the job finishes"""
+        cursor = int(self.headers.get('Last-Event-ID') or query.get('cursor', [0])[0])
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self._send_cors_headers()
+        self.end_headers()
+        
+        try:
+            while True:
+                chunk = self.loop_thread.run(self.api.jobs.read_output(job_id, cursor))
+                if "error" in chunk:
+                    self.wfile.write(f"event: error\ndata: {json.dumps(chunk)}\n\n".encode())
+                    break
+                cursor = chunk["cursor"]
+                if chunk["lines"]:
+                    data = json.dumps({"lines": chunk["lines"], "progress": chunk["job"]["progress"]})
+                    self.wfile.write(f"id: {cursor}\nevent: output\ndata: {data}\n\n".encode())
+                elif not chunk["done"]:
+                    self.wfile.write(b": keep-alive\n\n")
+                if chunk["done"]:
+                    self.wfile.write(f"event: done\ndata: {json.dumps(chunk['job'])}\n\n".encode())
+                    break
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _stream_events(self, events: LogBuffer, query: Dict):
+        """Follow an event buffer as Server-Sent Events (event name = entry level)"""
+        cursor = self.headers.get('Last-Event-ID') or query.get('since', [None])[0]
+        cursor = int(cursor) if cursor is not None else events.next_seq
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self._send_cors_headers()
+        self.end_headers()
+        
+        try:
+            while True:
+                chunk = events.wait(cursor, 15.0)
+                cursor = chunk["cursor"]
+                for entry in chunk["logs"]:
+                    self.wfile.write(f"id: {entry['seq'] + 1}\nevent: {entry['level']}\n"
+                                     f"data: {json.dumps(entry)}\n\n".encode())
+                if not chunk["logs"]:
+                    self.wfile.write(b": keep-alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
 
-def create_handler(api_instance):
+def create_handler(workspace, loop_thread):
     def handler(*args, **kwargs):
-        return APIRequestHandler(api_instance, *args, **kwargs)
+        return APIRequestHandler(workspace, loop_thread, *args, **kwargs)
     return handler
 
+def create_server(workspace, loop_thread, host: str = 'localhost', port: Optional[int] = None):
+    """Create the threaded API server bridged into the shared event loop"""
+    server = ThreadingHTTPServer((host, config.api_port if port is None else port),
+                                 create_handler(workspace, loop_thread))
+    server.daemon_threads = True
+    return server
+
 def main():
     print("🔧 Starting Android Dev Tool v2.0 Backend...")
     
-    api = DevToolAPI()
-    handler = create_handler(api)
+    workspace = Workspace()
+    loop_thread = EventLoopThread()
+    loop_thread.start()
+    asyncio.run_coroutine_threadsafe(metrics.sample_forever(), loop_thread.loop)
     
     try:
-        server = HTTPServer(('localhost', config.api_port), handler)
+        server = create_server(workspace, loop_thread)
         print(f"✅ Backend API running on http://localhost:{config.api_port}")
+        print(f"📂 Default project: {workspace.default_id} ({workspace.projects[workspace.default_id]})")
         print("📋 Available endpoints:")
         print("  GET  /api/project/info")
         print("  POST /api/project/install")
         print("  POST /api/project/build")
+        print("  POST /api/project/build?profile=1")
+        print("  GET  /api/project/build/profiles[/<id>[?trace=1]]")
         print("  POST /api/project/dev/start")
         print("  POST /api/project/dev/stop")
+        print("  GET  /api/project/dev/status")
+        print("  GET  /api/project/dev/logs?since=<cursor>")
         print("  POST /api/project/test")
+        print("  GET  /api/project/test/history?limit=10")
         print("  POST /api/project/lint")
+        print("  POST /api/project/check[?changed=1&base=<ref>&only=lint|test]")
         print("  GET  /api/project/analyze")
-        print("  GET  /api/logs")
+        print("  GET  /api/project/analyze/history")
+        print("  GET  /api/project/analyze/diff?from=<id>&to=<id>")
+        print("  GET  /api/logs?since=<cursor>&level=error&wait=<seconds>")
+        print("  POST /api/watch/start?actions=build,lint,test")
+        print("  POST /api/watch/stop")
+        print("  GET  /api/watch/status")
+        print("  GET  /api/watch/events  (Server-Sent Events: change, build, reload...)")
+        print("  POST /api/project/create  {name, framework}")
+        print("  GET  /api/search?q=<text>[&regex=1&case=1&glob=src/*&offset=&limit=&stream=1]")
+        print("  GET  /api/files?path=<file>[&raw=1]")
+        print("  POST /api/files        {path, content, ifMtime?, ifHash?}")
+        print("  POST /api/files/read   {paths: [...]}")
+        print("  POST /api/files/write  {files: [{path, content, ifMtime?, ifHash?}]}")
+        print("  GET  /api/files/stream?path=<file>")
+        print("  POST /api/jobs/{install,build,test,lint,check,deploy}")
+        print("  GET  /api/jobs")
+        print("  GET  /api/jobs/<id>")
+        print("  GET  /api/jobs/<id>/stream  (Server-Sent Events)")
+        print("  GET  /metrics  (Prometheus text format)")
+        print("  GET  /api/metrics/history?series=commands|process&kind=build&since=<unix time>")
+        print("  GET  /api/resources  (memory, limits and live process trees)")
+        print("  GET  /api/history  (store size and write stats)")
+        print("  GET  /api/history/runs?since=<unix time>&until=&command=<prefix>&kind=&status=&limit=")
+        print("  GET  /api/history/runs/<id>  (with stdout/stderr tail)")
+        print("  GET  /api/history/logs?since=<unix time>&until=&level=info,error&limit=")
+        print("  GET  /api/workspace")
+        print("  POST /api/workspace/add  {path, id?}")
+        print("  POST /api/workspace/remove?id=<project>")
+        print("  Any route for another project: /api/projects/<id>/... (or ?project=<id>)")
         print("\n⏹️  Press Ctrl+C to stop")
         
         server.serve_forever()
@@ -536,9 +4704,9 @@ def main():
         print("\n🛑 Shutting down backend...")
         server.shutdown()
         
-        # Clean up any running processes
-        if api.server_process and api.server_process.poll() is None:
-            api.server_process.terminate()
+        # Clean up any running processes in every project
+        loop_thread.run(workspace.shutdown())
+        loop_thread.stop()
         
         print("👋 Backend stopped")
 
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Android Dev Tool v2.0 - Backend benchmarks
+Runs against a throwaway stand-in project with a fake npm on PATH
+
+    python benchmark.py                              # every scenario, JSON on stdout
+    python benchmark.py analyze_bundle --output new.json
+    python benchmark.py --output new.json --compare old.json   # exit 1 on regressions
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import platform
+import subprocess
+import contextlib
+import shutil
+import tempfile
+import logging
+import argparse
+import threading
+import statistics
+import http.client
+import http.server
+import socketserver
+import urllib.request
+import importlib.util
+from pathlib import Path
+from typing import List
+
+import backend
+
+# android-dev-tool.py has a hyphen in its name, so load it by path
+_spec = importlib.util.spec_from_file_location(
+    "android_dev_tool", Path(__file__).with_name("android-dev-tool.py"))
+android_dev_tool = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(android_dev_tool)
+
+FAKE_NPM = """#!/bin/sh
+# Fake npm for benchmarks: every script just sleeps for a while
+case "$1" in
+    run) sleep "${FAKE_NPM_SECONDS:-5}"; echo "fake npm run $2 done" ;;
+    *) sleep "${FAKE_NPM_SECONDS:-5}"; echo "fake npm $1 done" ;;
+esac
+"""
+
+def make_project(root: Path) -> Path:
+    """Create a minimal project plus a fake npm binary"""
+    project = root / "project"
+    (project / "src").mkdir(parents=True)
+    (project / "package.json").write_text(json.dumps({
+        "name": "bench-project",
+        "version": "1.0.0",
+        "scripts": {"dev": "vite", "build": "vite build", "test": "vitest", "lint": "eslint ."},
+        "dependencies": {"react": "^18.0.0"}
+    }))
+    for i in range(200):
+        (project / "src" / f"module{i}.js").write_text(f"export const value{i} = {i};\n")
+
+    bin_dir = root / "bin"
+    bin_dir.mkdir()
+    npm = bin_dir / "npm"
+    npm.write_text(FAKE_NPM)
+    npm.chmod(0o755)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+    return project
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 2),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2)
+    }
+
+def measure(url: str, requests: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+@contextlib.contextmanager
+def running_backend(project: Path):
+    """The API server for a project on a free port; yields its base URL"""
+    workspace = backend.Workspace(project.parent / f"{project.name}-workspace.json", str(project),
+                                  str(project.parent / f"{project.name}-history.db"))
+    loop_thread = backend.EventLoopThread()
+    loop_thread.start()
+    server = backend.create_server(workspace, loop_thread, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://localhost:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        loop_thread.run(workspace.shutdown())
+        loop_thread.stop()
+
+def bench_concurrent_requests(project: Path, requests: int = 50) -> dict:
+    """info/log latency while idle versus while a long build is running"""
+    results = {}
+    with running_backend(project) as base:
+        for endpoint in ("/api/project/info", "/api/logs"):
+            results[f"idle {endpoint}"] = measure(base + endpoint, requests)
+
+        build = threading.Thread(
+            target=lambda: urllib.request.urlopen(
+                urllib.request.Request(base + "/api/project/build?force=1", method="POST")).read()
+        )
+        build.start()
+        time.sleep(0.2)
+        for endpoint in ("/api/project/info", "/api/logs"):
+            results[f"during build {endpoint}"] = measure(base + endpoint, requests)
+        results["build still running"] = build.is_alive()
+        build.join()
+    return results
+
+def bench_request_throughput(project: Path, clients: int = 8, requests: int = 250) -> dict:
+    """Requests per second through APIRequestHandler with parallel clients"""
+    results = {}
+    with running_backend(project) as base:
+        for endpoint in ("/api/logs?limit=20", "/api/project/info", "/api/project/dev/status"):
+            def client():
+                for _ in range(requests):
+                    with urllib.request.urlopen(base + endpoint) as response:
+                        response.read()
+            threads = [threading.Thread(target=client) for _ in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            seconds = time.perf_counter() - start
+            results[endpoint] = {"clients": clients, "requests": clients * requests,
+                                 "requests_per_sec": round(clients * requests / seconds)}
+    return results
+
+def bench_log_append(project: Path, capacity: int = 1000, appends: int = 200_000) -> dict:
+    """Append throughput at capacity: ring buffer versus the old list reslice"""
+    def entry(i):
+        return {"timestamp": "", "level": "info", "message": f"line {i}"}
+
+    ring = backend.LogBuffer(capacity)
+    for i in range(capacity):
+        ring.append(entry(i))
+    start = time.perf_counter()
+    for i in range(appends):
+        ring.append(entry(i))
+    ring_seconds = time.perf_counter() - start
+
+    logs = [entry(i) for i in range(capacity)]
+    start = time.perf_counter()
+    for i in range(appends):
+        logs.append(entry(i))
+        if len(logs) > capacity:
+            logs = logs[-capacity:]
+    list_seconds = time.perf_counter() - start
+
+    cursor = ring.next_seq - 100
+    start = time.perf_counter()
+    for _ in range(10_000):
+        ring.since(cursor, 100)
+    fetch_seconds = time.perf_counter() - start
+
+    return {
+        "capacity": capacity,
+        "ring_appends_per_sec": round(appends / ring_seconds),
+        "list_reslice_appends_per_sec": round(appends / list_seconds),
+        "fetch_100_since_cursor_us": round(fetch_seconds / 10_000 * 1e6, 2)
+    }
+
+def make_tree(root: Path, files: int, per_dir: int = 50):
+    """Synthetic node_modules-heavy tree: 95% of files under node_modules"""
+    counts = {"node_modules": 0, "src": 0}
+    for i in range(files):
+        area = "node_modules" if i % 20 else "src"
+        n = counts[area]
+        counts[area] += 1
+        directory = root / area / f"pkg{n // (per_dir * 20)}" / f"dir{(n // per_dir) % 20}"
+        if n % per_dir == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"file{n}.js").touch()
+
+def bench_project_info(project: Path, files: int = 100_000, requests: int = 30) -> dict:
+    """/api/project/info latency for a project with a large node_modules"""
+    big = project.parent / "info-project"
+    make_tree(big, files)
+    shutil.copy(project / "package.json", big / "package.json")
+    with running_backend(big) as base:
+        start = time.perf_counter()
+        with urllib.request.urlopen(base + "/api/project/info") as response:
+            info = json.loads(response.read())
+        cold_ms = (time.perf_counter() - start) * 1000
+        return {
+            "files": files,
+            "indexed_files": info.get("totalFiles"),
+            "cold_ms": round(cold_ms, 1),
+            "warm": measure(base + "/api/project/info", requests)
+        }
+
+def bench_project_index(project: Path, files: int = 200_000, repeats: int = 20) -> dict:
+    """/api/project/info file counting: rglob versus the cached scandir index"""
+    tree = project.parent / "big-project"
+    make_tree(tree, files)
+
+    start = time.perf_counter()
+    rglob_count = sum(1 for path in tree.rglob("*") if path.is_file())
+    rglob_seconds = time.perf_counter() - start
+
+    index = backend.ProjectIndex(tree)
+    start = time.perf_counter()
+    index.refresh()
+    cold_seconds = time.perf_counter() - start
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        index.refresh()
+        samples.append(time.perf_counter() - start)
+
+    return {
+        "files": files,
+        "rglob_files": rglob_count,
+        "rglob_ms": round(rglob_seconds * 1000, 1),
+        "indexed_files": index.file_count(),
+        "index_cold_ms": round(cold_seconds * 1000, 1),
+        "index_warm": percentiles(samples)
+    }
+
+def make_dist(root: Path, assets: int = 200, max_size: int = 20_000, large_size: int = 200_000) -> List[str]:
+    """Synthetic dist/: index.html plus hashed JS/CSS assets of mixed sizes.
+
+    Contents come from a seeded generator so compression ratios (and so the
+    timings) are the same on every run.
+    """
+    (root / "assets").mkdir(parents=True, exist_ok=True)
+    (root / "index.html").write_text("<!doctype html><html><body><div id=root></div></body></html>")
+    rng = random.Random(42)
+    paths = ["/index.html"]
+    for i in range(assets):
+        ext = "css" if i % 4 == 0 else "js"
+        size = large_size if i % 50 == 0 else 2_000 + (i * 137) % max_size
+        name = f"chunk{i}-{i:08x}.{ext}"
+        (root / "assets" / name).write_bytes(rng.randbytes(size // 2).hex().encode()[:size])
+        paths.append(f"/assets/{name}")
+    return paths
+
+def bench_analyze_bundle(project: Path, assets: int = 5000) -> dict:
+    """analyze_bundle on a large dist/: first run (compresses everything) versus unchanged rerun"""
+    bundle = project.parent / "bundle-project"
+    bundle.mkdir()
+    shutil.copy(project / "package.json", bundle / "package.json")
+    make_dist(bundle / "dist", assets, max_size=6_000, large_size=100_000)
+    api = backend.DevToolAPI(str(bundle), "bench")
+
+    async def run():
+        timings = {}
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            analysis = await api.analyze_bundle()
+            timings[f"{label}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        timings["recompressed_warm"] = analysis.get("recompressedFiles")
+        return timings
+
+    results = asyncio.run(run())
+    return {"files": assets + 1, "brotli": backend.brotli is not None, **results}
+
+def fetch_all(port: int, paths: List[str], clients: int, keep_alive: bool, revalidate: bool = False) -> dict:
+    """Fetch every path once per client, in parallel; returns throughput"""
+    etags = {}
+    lock = threading.Lock()
+    transferred = [0]
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for path in paths:
+            headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            with lock:
+                transferred[0] += len(body)
+                if response.getheader("ETag"):
+                    etags[path] = response.getheader("ETag")
+            if not keep_alive or response.will_close:
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.close()
+
+    if revalidate:
+        client()  # prime the ETags
+        transferred[0] = 0
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    requests = len(paths) * clients
+    return {
+        "requests": requests,
+        "requests_per_sec": round(requests / seconds),
+        "mb_per_sec": round(transferred[0] / seconds / 1e6, 1)
+    }
+
+def bench_static_serve(project: Path, clients: int = 8) -> dict:
+    """serve_build throughput: old SimpleHTTPRequestHandler vs the fast server"""
+    dist = project.parent / "serve-dist"
+    paths = make_dist(dist)
+
+    class LegacyHandler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(dist), **kwargs)
+
+        def end_headers(self):
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            super().end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    results = {}
+    legacy = socketserver.TCPServer(("127.0.0.1", 0), LegacyHandler)
+    threading.Thread(target=legacy.serve_forever, daemon=True).start()
+    try:
+        results["legacy"] = fetch_all(legacy.server_address[1], paths, clients, keep_alive=False)
+    finally:
+        legacy.shutdown()
+        legacy.server_close()
+
+    fast = android_dev_tool.criar_servidor_estatico(str(dist), 0, "127.0.0.1")
+    threading.Thread(target=fast.serve_forever, daemon=True).start()
+    try:
+        results["fast"] = fetch_all(fast.server_address[1], paths, clients, keep_alive=True)
+        results["fast_reload_304"] = fetch_all(fast.server_address[1], paths, clients,
+                                               keep_alive=True, revalidate=True)
+    finally:
+        fast.shutdown()
+        fast.server_close()
+
+    cached = android_dev_tool.criar_servidor_estatico(str(dist), 0, "127.0.0.1",
+                                                      cache_bytes=32 * 1024 * 1024)
+    threading.Thread(target=cached.serve_forever, daemon=True).start()
+    try:
+        results["fast_memory_cache"] = fetch_all(cached.server_address[1], paths, clients, keep_alive=True)
+        results["fast_memory_cache"]["cache"] = cached.RequestHandlerClass.cache.stats()
+    finally:
+        cached.shutdown()
+        cached.server_close()
+    return results
+
+SCENARIOS = {
+    "concurrent": bench_concurrent_requests,
+    "throughput": bench_request_throughput,
+    "project_info": bench_project_info,
+    "analyze_bundle": bench_analyze_bundle,
+    "log_append": bench_log_append,
+    "project_index": bench_project_index,
+    "static_serve": bench_static_serve,
+}
+
+def environment() -> dict:
+    """Where the numbers came from, so runs on different commits can be compared"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """{"a": {"b": 1}} -> {"a.b": 1}, numbers only"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Metrics that got worse by more than threshold percent.
+
+    Only timings (*_ms, *_us) and rates (*_per_sec) are compared; counts and
+    sizes describe the workload rather than its speed.
+    """
+    regressions = []
+    old, new = flatten(baseline.get("results", {})), flatten(current["results"])
+    for name, before in old.items():
+        after = new.get(name)
+        if after is None or not before:
+            continue
+        if name.endswith(("_ms", "_us")):
+            change = (after - before) / before * 100
+        elif name.endswith("_per_sec"):
+            change = (before - after) / before * 100
+        else:
+            continue
+        if change > threshold:
+            regressions.append(f"{name}: {before} -> {after} ({change:+.0f}% worse)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Android Dev Tool backend benchmarks")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), help="scenarios to run")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=15.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    # Keep per-request access logs out of the measurements
+    logging.disable(logging.INFO)
+    backend.APIRequestHandler.log_message = lambda self, *args: None
+
+    root = Path(tempfile.mkdtemp(prefix="devtool-bench-"))
+    try:
+        project = make_project(root)
+        report = {"environment": environment(),
+                  "results": {name: SCENARIOS[name](project) for name in args.scenarios}}
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()